@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from .auth import cache_user
+from .config import settings
+from .gamification import apply_progress
+from .database import (
+    achievements_collection, user_achievements_collection, users_collection,
+    tasks_collection, mood_logs_collection, sleep_logs_collection, user_skills_collection
+)
+from .documents import to_api
+from .jobs import current_job_id
+from . import events
+
+# In-process cache of the achievement catalog; it rarely changes, so one
+# load is shared by every request until the TTL runs out.
+_catalog = None
+_rules_by_event = {}
+_catalog_loaded_at = 0.0
+_catalog_lock = asyncio.Lock()
+
+# Catalog entries unlock through a rule on the event that can satisfy it:
+#   {"event": "task_completed", "counter": "tasks_completed", "threshold": 10}
+# Counters live on the user document under achievement_counters and are
+# incremented by the event; gauges (like the current streak) are passed
+# in the event payload as they are.
+DEFAULT_ACHIEVEMENTS = [
+    {"name": "First Steps", "description": "Complete your first task", "icon": "👣", "points": 10,
+     "category": "tasks", "rule": {"event": events.TASK_COMPLETED, "counter": "tasks_completed", "threshold": 1}},
+    {"name": "Task Master", "description": "Complete 50 tasks", "icon": "✅", "points": 50,
+     "category": "tasks", "rule": {"event": events.TASK_COMPLETED, "counter": "tasks_completed", "threshold": 50}},
+    {"name": "Deep Diver", "description": "Complete 10 deep work tasks", "icon": "🧠", "points": 30,
+     "category": "tasks", "rule": {"event": events.TASK_COMPLETED, "counter": "deep_work_completed", "threshold": 10}},
+    {"name": "Week Warrior", "description": "Keep a 7-day streak", "icon": "🔥", "points": 40,
+     "category": "streaks", "rule": {"event": events.TASK_COMPLETED, "gauge": "current_streak", "threshold": 7}},
+    {"name": "Dedicated Learner", "description": "Practice skills for 100 minutes", "icon": "📚", "points": 25,
+     "category": "skills", "rule": {"event": events.SKILL_PRACTICED, "counter": "practice_minutes", "threshold": 100}},
+    {"name": "Self Aware", "description": "Log your mood 7 times", "icon": "😊", "points": 15,
+     "category": "mood", "rule": {"event": events.MOOD_LOGGED, "counter": "mood_logs", "threshold": 7}},
+    {"name": "Sleep Tracker", "description": "Log your sleep 7 times", "icon": "😴", "points": 15,
+     "category": "sleep", "rule": {"event": events.SLEEP_LOGGED, "counter": "sleep_logs", "threshold": 7}},
+]
+
+def _catalog_expired() -> bool:
+    return time.monotonic() - _catalog_loaded_at > settings.ACHIEVEMENT_CATALOG_TTL_SECONDS
+
+async def get_achievement_catalog() -> list:
+    """Return the cached achievement catalog, reloading it once the TTL expires"""
+    global _catalog, _rules_by_event, _catalog_loaded_at
+    
+    if _catalog is not None and not _catalog_expired():
+        return _catalog
+    
+    async with _catalog_lock:
+        # Another request may have reloaded it while we waited for the lock
+        if _catalog is None or _catalog_expired():
+            catalog = []
+            rules_by_event = defaultdict(list)
+            async for achievement in achievements_collection.find():
+                to_api(achievement)
+                catalog.append(achievement)
+                
+                rule = achievement.get("rule")
+                if rule and rule.get("event"):
+                    rules_by_event[rule["event"]].append(achievement)
+            
+            _catalog = catalog
+            _rules_by_event = dict(rules_by_event)
+            _catalog_loaded_at = time.monotonic()
+    
+    return _catalog
+
+async def get_rules(event_type: str) -> list:
+    await get_achievement_catalog()
+    return _rules_by_event.get(event_type, [])
+
+def invalidate_achievement_catalog():
+    global _catalog
+    _catalog = None
+
+# Evaluation
+
+# Op ids of the evaluations applied to a user's counters, most recent last
+ACHIEVEMENT_OPS_KEPT = 100
+
+async def unlock(user_id: str, achievement: dict) -> bool:
+    """Record the unlock and award its points; returns False if it was already unlocked"""
+    # Safe to repeat: an unlock whose points weren't awarded yet (the job
+    # failed in between) gets them on the next run, and never twice
+    unlocked = await user_achievements_collection.find_one_and_update(
+        {"user_id": user_id, "achievement_id": achievement["id"]},
+        {"$setOnInsert": {"unlocked_at": datetime.utcnow(), "points_awarded": False}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    # Unlocks from before points_awarded existed were awarded at the time
+    if unlocked.get("points_awarded", True):
+        return False
+    
+    if achievement.get("points"):
+        # The op id makes the award itself at most once per unlock
+        user = await apply_progress(
+            user_id, achievement["points"], completed=False, op_id=f"achievement:{unlocked['_id']}"
+        )
+        if user:
+            await cache_user(user)
+    
+    await user_achievements_collection.update_one({"_id": unlocked["_id"]}, {"$set": {"points_awarded": True}})
+    return True
+
+async def evaluate(event_type: str, user_id: str, payload: dict) -> list:
+    """Bump the event's counters and unlock any rule whose threshold was just crossed"""
+    increments = {name: value for name, value in payload.get("counters", {}).items() if value}
+    gauges = payload.get("gauges", {})
+    
+    counters = {}
+    retried = False
+    if increments:
+        query = {"_id": ObjectId(user_id)}
+        update = {"$inc": {f"achievement_counters.{name}": value for name, value in increments.items()}}
+        op_id = current_job_id()
+        if op_id is not None:
+            query["achievement_ops"] = {"$ne": op_id}
+            update["$push"] = {"achievement_ops": {"$each": [op_id], "$slice": -ACHIEVEMENT_OPS_KEPT}}
+        
+        user = await users_collection.find_one_and_update(
+            query,
+            update,
+            projection={"achievement_counters": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if user is None and op_id is not None:
+            # A retry of an evaluation whose increments were already applied
+            retried = True
+            user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"achievement_counters": 1})
+        counters = (user or {}).get("achievement_counters", {})
+    
+    unlocked = []
+    for achievement in await get_rules(event_type):
+        rule = achievement["rule"]
+        threshold = rule.get("threshold", 1)
+        
+        if "counter" in rule:
+            name = rule["counter"]
+            if name not in increments:
+                continue
+            after = counters.get(name, 0)
+            before = after - increments[name]
+            # Only the event that crosses the threshold needs to touch the
+            # unlocks. A retry can't tell whether it crossed (other events may
+            # have counted since), so it checks every reached threshold;
+            # unlock is idempotent.
+            crossed = threshold <= after if retried else before < threshold <= after
+        else:
+            # A streak can pass the threshold without an event at exactly it
+            # (e.g. a backfill raised it); unlock is idempotent
+            crossed = (gauges.get(rule.get("gauge")) or 0) >= threshold
+        
+        if crossed and await unlock(user_id, achievement):
+            unlocked.append(achievement)
+    
+    return unlocked
+
+for _event_type in (events.TASK_COMPLETED, events.TASK_UNCOMPLETED, events.SKILL_PRACTICED,
+                    events.MOOD_LOGGED, events.SLEEP_LOGGED):
+    events.subscribe(_event_type, evaluate)
+
+async def seed_default_achievements() -> int:
+    """Insert DEFAULT_ACHIEVEMENTS, updating existing entries with the same name"""
+    for achievement in DEFAULT_ACHIEVEMENTS:
+        await achievements_collection.update_one(
+            {"name": achievement["name"]},
+            {"$set": achievement},
+            upsert=True
+        )
+    invalidate_achievement_catalog()
+    return len(DEFAULT_ACHIEVEMENTS)
+
+# Counter name -> (collection, $group accumulator) it is recomputed from
+COUNTER_SOURCES = {
+    "tasks_completed": (tasks_collection, {"$sum": {"$cond": ["$completed", 1, 0]}}),
+    "deep_work_completed": (tasks_collection, {"$sum": {"$cond": [{"$and": ["$completed", "$is_deep_work"]}, 1, 0]}}),
+    "practice_minutes": (user_skills_collection, {"$sum": {"$ifNull": ["$total_practice_time", 0]}}),
+    "mood_logs": (mood_logs_collection, {"$sum": 1}),
+    "sleep_logs": (sleep_logs_collection, {"$sum": 1}),
+}
+
+async def backfill_counters(batch_size: int = 1000) -> int:
+    """Recompute achievement_counters from raw data and unlock every counter rule already reached"""
+    # Counters only count events since they were introduced, so without
+    # this existing users' history never reaches a threshold
+    # One $group per collection, computing every counter that comes from it
+    groups = {}
+    for name, (collection, accumulator) in COUNTER_SOURCES.items():
+        groups.setdefault(collection.name, (collection, {"_id": "$user_id"}))[1][name] = accumulator
+    
+    counters = defaultdict(dict)
+    for collection, group in groups.values():
+        async for row in collection.aggregate([{"$group": group}], allowDiskUse=True):
+            counters[row.pop("_id")].update(row)
+    
+    rules = [achievement for achievement in await get_achievement_catalog() if "counter" in (achievement.get("rule") or {})]
+    ops = []
+    updated = 0
+    for user_id, values in counters.items():
+        try:
+            user_filter = {"_id": ObjectId(user_id)}
+        except (InvalidId, TypeError):
+            continue  # Orphaned documents with a malformed user id
+        values = {name: values.get(name, 0) for name in COUNTER_SOURCES}
+        ops.append(UpdateOne(user_filter, {"$set": {"achievement_counters": values}}))
+        if len(ops) >= batch_size:
+            await users_collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+        
+        for achievement in rules:
+            if values.get(achievement["rule"]["counter"], 0) >= achievement["rule"].get("threshold", 1):
+                await unlock(user_id, achievement)
+    
+    if ops:
+        await users_collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the achievement catalog")
+    parser.add_argument("command", choices=["seed", "backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    if args.command == "seed":
+        print(f"Seeded {asyncio.run(seed_default_achievements())} achievements")
+    else:
+        print(f"Backfilled achievement counters for {asyncio.run(backfill_counters(args.batch_size))} users")
@@ -1,52 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import calendar
+import hashlib
+import secrets
+import time
 from jose import JWTError, jwt
 import bcrypt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from .config import settings
-from .database import users_collection
+from .database import users_collection, revoked_tokens_collection
+from .cache import InMemoryLRUCache
+from .documents import USER_PROJECTION, to_api
+from .gamification import effective_streak
 from bson import ObjectId
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+# Verified token claims keyed by token digest, so repeat requests skip the
+# signature check and the revocation lookup. Entries never outlive the
+# token's exp. A revoked token is dropped from this worker's cache at once;
+# other workers stop accepting it within TOKEN_CACHE_TTL_SECONDS, so keep
+# that short.
+token_cache = InMemoryLRUCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+if settings.JWT_BACKEND == "pyjwt":
+    import jwt as pyjwt
+    
+    def _decode_token(token: str) -> dict:
+        try:
+            return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except pyjwt.PyJWTError as e:
+            raise JWTError(str(e))
+else:
+    def _decode_token(token: str) -> dict:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+# Authenticated users keyed by id, so most requests skip the users lookup.
+# Any write to a user document must call cache_user or invalidate_user.
+user_cache = InMemoryLRUCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+# bcrypt takes hundreds of milliseconds per call, so it runs on a bounded
+# thread pool (bcrypt releases the GIL) instead of blocking the event loop.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_pending_password_jobs = 0
+
+def password_queue_depth() -> int:
+    """Number of hash/verify calls queued or running on the password pool"""
+    return _pending_password_jobs
+
+async def _run_password_job(func, *args):
+    global _pending_password_jobs
+    
+    if _pending_password_jobs >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "1"},
+        )
+    
+    _pending_password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+def _checkpw(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password: str) -> str:
+def _hashpw(password: str) -> str:
     salt = bcrypt.gensalt()
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(_checkpw, plain_password, hashed_password)
+
+async def get_password_hash(password: str) -> str:
+    return await _run_password_job(_hashpw, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifies the token for revocation, iat for tokens_valid_after
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "jti": secrets.token_urlsafe(16)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        claims = await verify_token(token)
     except JWTError:
         raise credentials_exception
     
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    user_id = claims["sub"]
+    user = await user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        user = await users_collection.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
+        if user is None:
+            raise credentials_exception
+        
+        to_api(user)
+        await user_cache.set(user_id, user)
     
-    user["id"] = str(user["_id"])
-    user.pop("_id", None)
-    user.pop("hashed_password", None)
+    # Logging out everywhere invalidates every token issued before it
+    valid_after = user.get("tokens_valid_after")
+    if valid_after and claims["iat"] < calendar.timegm(valid_after.utctimetuple()):
+        raise credentials_exception
     
+    # Hand out a copy so handlers can't mutate the cached entry. The full
+    # document (preferences included, password hash excluded) is the
+    # request's user context; handlers read preferences from it rather
+    # than querying users again.
+    user = dict(user)
+    user["current_streak"] = effective_streak(user)
+    request.state.user = user
     return user
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+async def verify_token(token: str) -> dict:
+    """Return the sub, jti, iat and exp claims of a valid, unrevoked token, or raise JWTError"""
+    key = _token_key(token)
+    claims = await token_cache.get(key)
+    if claims is not None and claims["exp"] > time.time():
+        return claims
+    
+    payload = _decode_token(token)
+    if payload.get("sub") is None:
+        raise JWTError("Token has no subject")
+    
+    # Tokens issued before jti was added are revoked by their digest
+    jti = payload.get("jti")
+    if await revoked_tokens_collection.find_one({"_id": jti or key}, {"_id": 1}):
+        raise JWTError("Token has been revoked")
+    
+    claims = {
+        "sub": payload["sub"],
+        "jti": jti,
+        "iat": payload.get("iat", 0),  # Tokens from before iat was added count as oldest
+        "exp": payload["exp"],
+    }
+    await token_cache.set(key, claims, ttl=min(settings.TOKEN_CACHE_TTL_SECONDS, claims["exp"] - time.time()))
+    return claims
+
+async def revoke_token(token: str, claims: dict):
+    """Reject this token from now on, here at once and on other workers after their cache TTL"""
+    key = _token_key(token)
+    await revoked_tokens_collection.update_one(
+        {"_id": claims.get("jti") or key},
+        {"$set": {"expires_at": datetime.utcfromtimestamp(claims["exp"])}},
+        upsert=True
+    )
+    await token_cache.delete(key)
+
+async def cache_user(user: dict):
+    """Store a freshly loaded or written user (already mapped, no password hash)"""
+    await user_cache.set(user["id"], dict(user))
+
+async def invalidate_user(user_id: str):
+    await user_cache.delete(user_id)
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Cache backends share one async interface so the in-process LRU can later
+# be swapped for a shared store (e.g. Redis) without touching callers.
+
+class CacheBackend:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+    
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+    
+    async def delete(self, key: str):
+        raise NotImplementedError
+    
+    async def clear(self):
+        raise NotImplementedError
+    
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+class InMemoryLRUCache(CacheBackend):
+    """Bounded LRU cache whose entries also expire after a TTL"""
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 60):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+    
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+    
+    async def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
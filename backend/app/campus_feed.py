@@ -0,0 +1,108 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Optional
+from .config import settings
+from .database import campus_events_collection
+from .documents import model_projection
+from .pagination import decode_cursor, encode_cursor
+from .schemas import CampusEventResponse
+from .stats import day_start
+
+# In-process cache of upcoming campus events (from the start of today on),
+# shared by every user. Events are bucketed by category and kept in
+# (event_date, id) order, so a feed page is a bisect and a slice. The cache
+# reloads after its TTL, when the day changes, and when this worker creates
+# or deletes an event; other workers catch up within the TTL.
+_feed = None
+_feed_loaded_at = 0.0
+_feed_lock = asyncio.Lock()
+
+class _Bucket:
+    def __init__(self):
+        self.events = []
+        self.keys = []  # (event_date, id); ObjectId hex strings sort like ObjectIds
+    
+    def add(self, event: dict):
+        self.events.append(event)
+        self.keys.append((event["event_date"], event["id"]))
+
+class CampusFeed:
+    def __init__(self, window_start: datetime, events: list, truncated: bool):
+        self.window_start = window_start
+        # Past the last loaded event the cache only knows about a truncated load
+        self.complete_until = events[-1]["event_date"] if truncated else None
+        self.buckets = {None: _Bucket()}
+        for event in events:
+            self.buckets[None].add(event)
+            self.buckets.setdefault(event.get("category"), _Bucket()).add(event)
+        
+        # Content digest, so every worker holding the same events agrees on ETags
+        self.version = hashlib.sha1(
+            json.dumps([window_start] + events, default=str, sort_keys=True).encode()
+        ).hexdigest()
+    
+    def page(
+        self,
+        category: Optional[str],
+        start: datetime,
+        end: Optional[datetime],
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Optional[tuple]:
+        """One page of events as (docs, next_cursor), or None if the cache can't answer it"""
+        bucket = self.buckets.get(category)
+        if bucket is None:
+            # A truncated load may have missed the category's later events
+            return None if self.complete_until is not None else ([], None)
+        
+        position = bisect.bisect_left(bucket.keys, (start, ""))
+        if cursor:
+            value, last_id = decode_cursor(cursor)
+            position = max(position, bisect.bisect_right(bucket.keys, (value, str(last_id))))
+        
+        stop = len(bucket.keys) if end is None else bisect.bisect_left(bucket.keys, (end, ""))
+        docs = bucket.events[position:min(stop, position + limit + 1)]
+        
+        if self.complete_until is not None and len(docs) <= limit and (end is None or end > self.complete_until):
+            # The page runs past what was loaded
+            return None
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["event_date"], docs[-1]["id"])
+        return docs, next_cursor
+
+def _feed_expired() -> bool:
+    return (
+        time.monotonic() - _feed_loaded_at > settings.CAMPUS_EVENTS_CACHE_TTL_SECONDS
+        or _feed.window_start != day_start(datetime.utcnow())
+    )
+
+async def get_campus_feed() -> CampusFeed:
+    global _feed, _feed_loaded_at
+    
+    if _feed is not None and not _feed_expired():
+        return _feed
+    
+    async with _feed_lock:
+        # Another request may have reloaded it while we waited for the lock
+        if _feed is None or _feed_expired():
+            window_start = day_start(datetime.utcnow())
+            max_size = settings.CAMPUS_EVENTS_CACHE_MAX_SIZE
+            events = await campus_events_collection.find(
+                {"event_date": {"$gte": window_start}}, model_projection(CampusEventResponse)
+            ).sort([("event_date", 1), ("_id", 1)]).limit(max_size).to_list(max_size)
+            
+            _feed = CampusFeed(window_start, events, truncated=len(events) >= max_size)
+            _feed_loaded_at = time.monotonic()
+    
+    return _feed
+
+def invalidate_campus_feed():
+    global _feed
+    _feed = None
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Conditional GET helpers. ETags are weak: they identify the data behind a
+# response, not its exact bytes, so any encoding of it may be revalidated.
+
+CACHE_CONTROL = "private, no-cache"  # Browsers keep the response but always revalidate
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names `etag` (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def _http_date(value: datetime) -> str:
+    # Stored datetimes are naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def _validators(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+def modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """Whether the resource changed after If-Modified-Since; true without a usable header"""
+    header = request.headers.get("if-modified-since")
+    if not header or last_modified is None:
+        return True
+    try:
+        since = parsedate_to_datetime(header).astimezone(timezone.utc).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return True
+    return last_modified.replace(microsecond=0) > since
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=_validators(etag, last_modified))
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers.update(_validators(etag, last_modified))
+
+def check_conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """A 304 response if the client's copy is current; otherwise set the validators on `response`"""
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if request.headers.get("if-none-match"):
+        current = etag_matches(request, etag)
+    else:
+        current = last_modified is not None and not modified_since(request, last_modified)
+    
+    if current:
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return None
@@ -5,11 +5,33 @@ class Settings(BaseSettings):
     # MongoDB
     MONGODB_URL: str
     DB_NAME: str = "planwise"
+    ENSURE_INDEXES_ON_STARTUP: bool = True
+    REBUILD_ROLLUPS_ON_STARTUP: bool = False  # Once per rollup version, in the background; races live writes
+    MONGO_MAX_POOL_SIZE: int = 100  # Per worker process
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None  # Close connections idle this long; None keeps them
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None  # Fail a checkout that waits this long; None waits
+    MONGO_COMPRESSORS: str = ""  # e.g. "zstd,snappy,zlib" (zstd needs zstandard, snappy python-snappy)
+    MONGO_SECONDARY_READS: bool = False  # Route analytics and list reads to secondaries (secondaryPreferred)
+    MONGO_MAX_STALENESS_SECONDS: int = 90  # Minimum 90
+    
+    # Server (serve.py) and startup
+    WEB_CONCURRENCY: int = 0  # Worker processes; 0 uses one per available CPU
+    SERVER_MAX_WORKERS: int = 8
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 15  # Open connections (e.g. event streams) are closed after this
+    WARMUP_ON_STARTUP: bool = True  # Check indexes and preload caches before taking traffic
+    WARMUP_CONNECTIONS: int = 4  # Mongo connections opened per worker at startup
+    WARMUP_STEP_TIMEOUT_SECONDS: float = 20
     
     # JWT Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 43200  # 30 days
+    JWT_BACKEND: str = "jose"  # "jose" or "pyjwt" (faster decode, pip install PyJWT)
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 10  # How long other workers may accept a revoked token
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 256
     
     # OAuth - Google
     GOOGLE_CLIENT_ID: Optional[str] = None
@@ -28,6 +50,43 @@ class Settings(BaseSettings):
     APP_NAME: str = "PlanWise"
     DEBUG: bool = True
     
+    # Pagination
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Responses
+    FAST_JSON_RESPONSES: bool = False  # Encode responses with orjson when it's installed
+    TRUSTED_RESPONSES: bool = False  # Skip response model validation for list endpoints
+    
+    # Observability
+    METRICS_ENABLED: bool = False
+    SERVER_TIMING_ENABLED: bool = False
+    
+    # Background jobs
+    JOB_QUEUE_CONCURRENCY: int = 4
+    JOB_QUEUE_MAX_SIZE: int = 10000
+    JOB_MAX_RETRIES: int = 3
+    JOB_RETRY_DELAY_SECONDS: float = 0.5
+    JOB_QUEUE_DURABLE: bool = False  # Persist jobs in Mongo so they survive restarts
+    JOB_DRAIN_TIMEOUT_SECONDS: float = 10
+    
+    # Caching
+    ACHIEVEMENT_CATALOG_TTL_SECONDS: int = 300
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    CAMPUS_EVENTS_CACHE_TTL_SECONDS: int = 60
+    DATA_VERSION_CACHE_TTL_SECONDS: float = 5  # 0 checks the version in Mongo on every conditional request
+    CAMPUS_EVENTS_CACHE_MAX_SIZE: int = 5000
+    
+    # Live updates (Server-Sent Events)
+    STREAM_BACKEND: str = "memory"  # "mongo" fans out through a change stream so every worker sees every event
+    STREAM_MAX_CONNECTIONS_PER_USER: int = 5  # Per worker
+    STREAM_QUEUE_SIZE: int = 100  # Events buffered per stream before the client is told to resync
+    STREAM_HEARTBEAT_SECONDS: float = 15
+    STREAM_RETRY_MILLISECONDS: int = 5000
+    STREAM_EVENT_TTL_SECONDS: int = 3600  # How long published events stay in stream_events
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
@@ -1,12 +1,184 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.read_preferences import SecondaryPreferred
 from .config import settings
 
+# Command tracking: counts the Mongo commands issued inside track_commands().
+# Motor runs pymongo on a thread pool but copies the caller's context, so
+# the listener sees the ContextVar of the request that issued the command.
+
+class CommandStats:
+    def __init__(self):
+        self.count = 0
+        self.commands = []
+        self.duration = 0.0  # seconds
+        self.documents = 0
+    
+    def record(self, command_name: str):
+        self.count += 1
+        self.commands.append(command_name)
+    
+    def record_reply(self, duration_micros: int, reply: dict):
+        self.duration += duration_micros / 1_000_000
+        cursor = reply.get("cursor")
+        if cursor:
+            self.documents += len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+        elif reply.get("value") is not None:
+            # findAndModify
+            self.documents += 1
+
+_command_stats = ContextVar("command_stats", default=None)
+
+class _CommandTracker(monitoring.CommandListener):
+    def started(self, event):
+        stats = _command_stats.get()
+        if stats is not None:
+            stats.record(event.command_name)
+    
+    def succeeded(self, event):
+        stats = _command_stats.get()
+        if stats is not None:
+            stats.record_reply(event.duration_micros, event.reply)
+    
+    def failed(self, event):
+        stats = _command_stats.get()
+        if stats is not None:
+            stats.record_reply(event.duration_micros, {})
+
+def current_command_stats():
+    return _command_stats.get()
+
+@contextmanager
+def track_commands():
+    """Count the DB commands issued in this block, e.g. to assert an endpoint's query budget"""
+    stats = CommandStats()
+    token = _command_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _command_stats.reset(token)
+
+# Pool tracking: connections open and in use, checkouts waiting, and how long
+# each checkout waited. Use it to size MONGO_MAX_POOL_SIZE: long waits with
+# every connection in use mean the pool is too small for the load.
+
+class PoolStats:
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0  # e.g. MONGO_WAIT_QUEUE_TIMEOUT_MS expired
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+        self.cleared = 0
+        self.wait_observer = None  # Called with every checkout wait (seconds) when metrics are on
+        # Motor runs pool operations on its executor threads, so the counters
+        # are updated from several threads at once
+        self._lock = threading.Lock()
+    
+    def add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+    
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        if self.wait_observer is not None:
+            self.wait_observer(seconds)
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+                "cleared": self.cleared,
+            }
+
+pool_stats = PoolStats()
+
+class _PoolTracker(monitoring.ConnectionPoolListener):
+    # A checkout starts and finishes on the same thread, so the start time
+    # can be kept per thread for pymongo versions without event.duration
+    def __init__(self):
+        self._local = threading.local()
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pool_stats.add(cleared=1)
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        pool_stats.add(open=1)
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        pool_stats.add(open=-1)
+    
+    def connection_check_out_started(self, event):
+        pool_stats.add(waiting=1)
+        self._local.started = time.perf_counter()
+    
+    def connection_check_out_failed(self, event):
+        pool_stats.add(waiting=-1, checkout_failures=1)
+    
+    def connection_checked_out(self, event):
+        wait = getattr(event, "duration", None)
+        if wait is None:
+            wait = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        pool_stats.record_checkout(wait)
+    
+    def connection_checked_in(self, event):
+        pool_stats.add(in_use=-1)
+
+def _pool_options() -> dict:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        # Unavailable compressors are skipped by pymongo; the server picks
+        # the first one it supports
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
+
 # MongoDB client with SSL/TLS support for Atlas
 # For mongodb+srv://, SSL is automatically handled, but we can add explicit parameters if needed
 client = AsyncIOMotorClient(
     settings.MONGODB_URL,
     serverSelectionTimeoutMS=5000,  # 5 second timeout
     connectTimeoutMS=10000,  # 10 second connection timeout
+    event_listeners=[_CommandTracker(), _PoolTracker()],
+    **_pool_options(),
 )
 database = client[settings.DB_NAME]
 
@@ -19,6 +191,34 @@ user_skills_collection = database.get_collection("user_skills")
 achievements_collection = database.get_collection("achievements")
 user_achievements_collection = database.get_collection("user_achievements")
 campus_events_collection = database.get_collection("campus_events")
+user_daily_stats_collection = database.get_collection("user_daily_stats")
+jobs_collection = database.get_collection("jobs")
+revoked_tokens_collection = database.get_collection("revoked_tokens")
+stream_events_collection = database.get_collection("stream_events")
+
+# Read routing. Writes and reads that must see them use the primary (the
+# client default). Analytics and list reads may go to a secondary within
+# MONGO_MAX_STALENESS_SECONDS, but only once the data being read hasn't
+# changed for that long, so users still see their own writes.
+
+# Mongo rejects a max staleness below 90 seconds
+MAX_STALENESS_SECONDS = max(90, settings.MONGO_MAX_STALENESS_SECONDS)
+_secondary_preferred = SecondaryPreferred(max_staleness=MAX_STALENESS_SECONDS)
+_secondary_collections = {}
+
+def secondary_reads(collection, modified_at: Optional[datetime] = None):
+    """`collection` reading from a secondary, if enabled and the data last changed before `modified_at` + max staleness"""
+    if not settings.MONGO_SECONDARY_READS:
+        return collection
+    if modified_at is not None and datetime.utcnow() - modified_at < timedelta(seconds=MAX_STALENESS_SECONDS):
+        return collection
+    
+    secondary = _secondary_collections.get(collection.name)
+    if secondary is None:
+        secondary = _secondary_collections[collection.name] = collection.with_options(
+            read_preference=_secondary_preferred
+        )
+    return secondary
 
 async def get_database():
     return database
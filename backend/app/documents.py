@@ -0,0 +1,36 @@
+from typing import Optional
+
+# Mapping between Mongo documents and API documents, in one place.
+# Reads that feed a response model project just that model's fields and
+# convert _id to a string `id` on the server, so the documents come back
+# ready to return. Documents loaded or written whole go through to_api.
+# Private user fields are never projected and are dropped by to_api.
+
+PRIVATE_USER_FIELDS = ("hashed_password",)
+
+# Bookkeeping for retried jobs (op ids already applied); never needed by a request
+JOB_OP_FIELDS = ("achievement_ops", "progress_ops")
+
+# For reads of a full user document (internal fields included)
+USER_PROJECTION = {field: 0 for field in PRIVATE_USER_FIELDS + JOB_OP_FIELDS}
+
+def fields_projection(fields) -> dict:
+    """Projection returning `fields` with `id` converted to a string by the server"""
+    projection = {field: 1 for field in fields if field != "id" and field not in PRIVATE_USER_FIELDS}
+    projection["_id"] = 0
+    projection["id"] = {"$toString": "$_id"}
+    return projection
+
+def model_projection(model, fields: Optional[list] = None) -> dict:
+    """Projection for a response model, or just the requested subset of its fields"""
+    return fields_projection(fields or model.model_fields)
+
+def to_api(doc: Optional[dict]) -> Optional[dict]:
+    """Replace `_id` with its string `id` and drop private fields, in place"""
+    if doc is None:
+        return None
+    if "_id" in doc:
+        doc["id"] = str(doc.pop("_id"))
+    for field in PRIVATE_USER_FIELDS:
+        doc.pop(field, None)
+    return doc
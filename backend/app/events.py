@@ -0,0 +1,25 @@
+from collections import defaultdict
+from .jobs import background_job, enqueue
+
+# Domain events raised by the routers after a write. Handlers subscribe by
+# event type, so each write only reaches the code that cares about it.
+
+TASK_COMPLETED = "task_completed"
+TASK_UNCOMPLETED = "task_uncompleted"
+SKILL_PRACTICED = "skill_practiced"
+MOOD_LOGGED = "mood_logged"
+SLEEP_LOGGED = "sleep_logged"
+
+_handlers = defaultdict(list)
+
+def subscribe(event_type: str, handler):
+    """Register `async handler(event_type, user_id, payload)` for an event type"""
+    if not hasattr(handler, "job_name"):
+        background_job(handler)
+    _handlers[event_type].append(handler)
+
+async def publish(event_type: str, user_id: str, **payload):
+    # Each handler runs as its own background job, so a failure is retried
+    # on its own and never fails the write that raised the event
+    for handler in _handlers.get(event_type, []):
+        await enqueue(handler, event_type, user_id, payload)
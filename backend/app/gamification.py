@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from .database import users_collection, tasks_collection
+from .documents import USER_PROJECTION, to_api
+from .stats import day_start
+from .stream import stream_hub, PROGRESS
+from .versions import remember_data_version
+
+# Levels and streaks. Both are kept on the user document and updated in
+# place on every completion, so nothing ever rescans task history outside
+# of the backfill job below.
+
+# Minimum total_points for each level (see POINTS_SYSTEM.md)
+LEVEL_THRESHOLDS = [0, 100, 300, 600, 1000, 1500, 2200, 3000, 4000, 5000]
+
+# Same rule as level_for_points, evaluated server-side in update pipelines
+LEVEL_EXPRESSION = {"$add": [1, {"$size": {"$filter": {
+    "input": LEVEL_THRESHOLDS[1:],
+    "cond": {"$gte": [{"$ifNull": ["$total_points", 0]}, "$$this"]}
+}}}]}
+
+def level_for_points(points: int) -> int:
+    return sum(1 for threshold in LEVEL_THRESHOLDS if points >= threshold) or 1
+
+def effective_streak(user: dict, now: Optional[datetime] = None) -> int:
+    """The stored streak only counts while the user was active today or yesterday"""
+    last_active_day = user.get("last_active_day")
+    if last_active_day is None:
+        return 0
+    
+    today = day_start(now or datetime.utcnow())
+    if last_active_day < today - timedelta(days=1):
+        return 0
+    return user.get("current_streak", 0)
+
+# Op ids of the guarded progress updates applied to a user, most recent last
+PROGRESS_OPS_KEPT = 100
+
+async def apply_progress(
+    user_id: str,
+    points: int,
+    completed: bool,
+    when: Optional[datetime] = None,
+    op_id: Optional[str] = None
+) -> Optional[dict]:
+    """Add points and, for a completion, extend the streak; returns the updated user"""
+    # With an op_id the update applies at most once; a repeat returns None
+    stage = {
+        "total_points": {"$add": [{"$ifNull": ["$total_points", 0]}, points]},
+        "data_version": {"$add": [{"$ifNull": ["$data_version", 0]}, 1]},
+        "data_modified_at": datetime.utcnow(),
+    }
+    
+    if completed:
+        today = day_start(when or datetime.utcnow())
+        yesterday = today - timedelta(days=1)
+        stage["current_streak"] = {"$switch": {
+            "branches": [
+                # Already active today: the streak doesn't change
+                {"case": {"$eq": ["$last_active_day", today]},
+                 "then": {"$max": [{"$ifNull": ["$current_streak", 0]}, 1]}},
+                # Active yesterday: extend the run
+                {"case": {"$eq": ["$last_active_day", yesterday]},
+                 "then": {"$add": [{"$ifNull": ["$current_streak", 0]}, 1]}},
+            ],
+            "default": 1
+        }}
+        stage["last_active_day"] = today
+    
+    # Undoing a completion takes the points back but not the active day
+    pipeline = [
+        {"$set": stage},
+        {"$set": {
+            "longest_streak": {"$max": [{"$ifNull": ["$longest_streak", 0]}, {"$ifNull": ["$current_streak", 0]}]},
+            "level": LEVEL_EXPRESSION
+        }}
+    ]
+    
+    query = {"_id": ObjectId(user_id)}
+    if op_id is not None:
+        query["progress_ops"] = {"$ne": op_id}
+        stage["progress_ops"] = {"$slice": [
+            {"$concatArrays": [{"$ifNull": ["$progress_ops", []]}, [op_id]]}, -PROGRESS_OPS_KEPT
+        ]}
+    
+    user = await users_collection.find_one_and_update(
+        query,
+        pipeline,
+        projection=USER_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if user:
+        to_api(user)
+        await remember_data_version(user)
+        await stream_hub.publish(PROGRESS, {
+            field: user.get(field, 0) for field in ("total_points", "level", "current_streak", "longest_streak")
+        }, user_id)
+    return user
+
+# Backfill
+
+def _streaks(days: list) -> tuple:
+    """(current run, longest run) over ascending, distinct active days"""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+async def backfill(batch_size: int = 1000) -> int:
+    """Recompute streaks and levels for every user in one streaming pass over tasks"""
+    run_at = datetime.utcnow()
+    pipeline = [
+        {"$match": {"completed": True}},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateTrunc": {"date": {"$ifNull": ["$completed_at", "$updated_at"]}, "unit": "day"}}
+            }
+        }},
+        {"$sort": {"_id.user_id": 1, "_id.day": 1}},
+    ]
+    
+    ops = []
+    updated = 0
+    
+    async def flush():
+        nonlocal ops, updated
+        if ops:
+            await users_collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    
+    def queue(user_id: str, days: list):
+        current, longest = _streaks(days)
+        try:
+            user_filter = {"_id": ObjectId(user_id)}
+        except InvalidId:
+            return  # Orphaned task with a malformed user id
+        ops.append(UpdateOne(user_filter, [{"$set": {
+            "current_streak": current,
+            "longest_streak": longest,
+            "last_active_day": days[-1],
+            "level": LEVEL_EXPRESSION,
+            "gamification_backfilled_at": run_at
+        }}]))
+    
+    user_id = None
+    days = []
+    async for row in tasks_collection.aggregate(pipeline, allowDiskUse=True):
+        if row["_id"]["user_id"] != user_id:
+            if user_id is not None:
+                queue(user_id, days)
+            user_id, days = row["_id"]["user_id"], []
+        days.append(row["_id"]["day"])
+        
+        if len(ops) >= batch_size:
+            await flush()
+    
+    if user_id is not None:
+        queue(user_id, days)
+    await flush()
+    
+    # Users without any completed task have no streak
+    result = await users_collection.update_many(
+        {"gamification_backfilled_at": {"$ne": run_at}},
+        [{"$set": {
+            "current_streak": 0,
+            "longest_streak": 0,
+            "last_active_day": None,
+            "level": LEVEL_EXPRESSION,
+            "gamification_backfilled_at": run_at
+        }}]
+    )
+    
+    return updated + result.modified_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute streaks and levels for every user")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    print(f"Backfilled {asyncio.run(backfill(args.batch_size))} users")
@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from .config import settings
+from .database import database
+
+# Bump INDEX_VERSION whenever INDEXES or DROPPED_INDEXES change so running
+# deployments pick the new definitions up on their next startup.
+INDEX_VERSION = 8
+
+def _user_created_at():
+    # _id is the pagination tie-breaker, so it is part of the sort key
+    return IndexModel(
+        [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        name="user_created_at_id"
+    )
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "tasks": [
+        _user_created_at(),
+        IndexModel(
+            [("user_id", ASCENDING), ("completed", ASCENDING), ("updated_at", DESCENDING)],
+            name="user_completed_updated_at"
+        ),
+    ],
+    "mood_logs": [_user_created_at()],
+    "sleep_logs": [_user_created_at()],
+    "user_skills": [_user_created_at()],
+    "user_achievements": [
+        IndexModel(
+            [("user_id", ASCENDING), ("achievement_id", ASCENDING)],
+            name="user_achievement_unique",
+            unique=True
+        ),
+    ],
+    "user_daily_stats": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_day_unique", unique=True),
+    ],
+    "jobs": [
+        IndexModel([("status", ASCENDING), ("run_after", ASCENDING)], name="status_run_after"),
+        IndexModel([("status", ASCENDING), ("locked_at", ASCENDING)], name="status_locked_at"),
+    ],
+    "campus_events": [
+        IndexModel([("event_date", ASCENDING), ("_id", ASCENDING)], name="event_date_id"),
+        IndexModel(
+            [("category", ASCENDING), ("event_date", ASCENDING), ("_id", ASCENDING)],
+            name="category_event_date_id"
+        ),
+    ],
+    "revoked_tokens": [
+        # Entries are only needed until the token would have expired anyway
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "stream_events": [
+        # Workers read events off the change stream; the documents are only a log
+        IndexModel(
+            [("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=settings.STREAM_EVENT_TTL_SECONDS
+        ),
+    ],
+}
+
+# Indexes retired by a later INDEX_VERSION, dropped when migrating
+DROPPED_INDEXES = {
+    # v2: (user_id, created_at) replaced by (user_id, created_at, _id)
+    "tasks": ["user_created_at"],
+    "mood_logs": ["user_created_at"],
+    "sleep_logs": ["user_created_at"],
+    "user_skills": ["user_created_at"],
+}
+
+# Queries on the request path that must be served by an index
+HOT_QUERIES = [
+    ("tasks", {"user_id": "explain"}, [("created_at", DESCENDING)]),
+    ("tasks", {"user_id": "explain", "completed": True, "updated_at": {"$gte": datetime(1970, 1, 1)}}, None),
+    ("mood_logs", {"user_id": "explain", "created_at": {"$gte": datetime(1970, 1, 1)}}, [("created_at", DESCENDING)]),
+    ("sleep_logs", {"user_id": "explain", "created_at": {"$gte": datetime(1970, 1, 1)}}, [("created_at", DESCENDING)]),
+    ("user_skills", {"user_id": "explain"}, [("created_at", DESCENDING)]),
+    ("user_achievements", {"user_id": "explain"}, None),
+    ("users", {"email": "explain@example.com"}, None),
+    ("campus_events", {}, [("event_date", ASCENDING), ("_id", ASCENDING)]),
+    ("campus_events", {"category": "explain", "event_date": {"$gte": datetime(1970, 1, 1)}},
+     [("event_date", ASCENDING), ("_id", ASCENDING)]),
+    ("user_daily_stats", {"user_id": "explain", "day": {"$gte": datetime(1970, 1, 1)}}, [("day", ASCENDING)]),
+]
+
+meta_collection = database.get_collection("schema_meta")
+
+async def get_applied_version() -> int:
+    meta = await meta_collection.find_one({"_id": "indexes"})
+    return meta.get("version", 0) if meta else 0
+
+async def ensure_indexes(force: bool = False) -> bool:
+    """Create missing indexes and drop retired ones; returns True if anything was applied"""
+    if not force and await get_applied_version() >= INDEX_VERSION:
+        return False
+    
+    failed = False
+    for name, indexes in INDEXES.items():
+        collection = database.get_collection(name)
+        
+        for index_name in DROPPED_INDEXES.get(name, []):
+            try:
+                await collection.drop_index(index_name)
+            except OperationFailure:
+                pass  # Already gone
+        
+        try:
+            await collection.create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate emails blocking a unique index; keep going so the
+            # remaining collections still get their indexes
+            print(f"Failed to create indexes on {name}: {e}")
+            failed = True
+    
+    if not failed:
+        await meta_collection.update_one(
+            {"_id": "indexes"},
+            {"$set": {"version": INDEX_VERSION, "applied_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    return True
+
+async def index_report() -> dict:
+    """Compare the live indexes with INDEXES and flag ones that are never used"""
+    report = {}
+    for name, indexes in INDEXES.items():
+        collection = database.get_collection(name)
+        expected = {index.document["name"] for index in indexes}
+        
+        usage = {}
+        async for stat in collection.aggregate([{"$indexStats": {}}]):
+            usage[stat["name"]] = stat["accesses"]["ops"]
+        
+        report[name] = {
+            "missing": sorted(expected - usage.keys()),
+            "unused": sorted(index for index, ops in usage.items() if ops == 0 and index != "_id_"),
+            "unmanaged": sorted(index for index in usage if index not in expected and index != "_id_"),
+        }
+    
+    return report
+
+def _plan_stages(plan: dict) -> list:
+    stages = [plan["stage"]] if "stage" in plan else []
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    if "queryPlan" in plan:
+        stages += _plan_stages(plan["queryPlan"])
+    return stages
+
+async def explain_hot_queries() -> list:
+    """Explain each hot query and report whether its winning plan uses an index"""
+    results = []
+    for name, query, sort in HOT_QUERIES:
+        cursor = database.get_collection(name).find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        
+        explanation = await cursor.explain()
+        stages = _plan_stages(explanation["queryPlanner"]["winningPlan"])
+        
+        results.append({
+            "collection": name,
+            "query": str(query),
+            "stages": stages,
+            "uses_index": "IXSCAN" in stages and "COLLSCAN" not in stages,
+        })
+    
+    return results
+
+async def _main(command: str) -> int:
+    if command == "apply":
+        await ensure_indexes(force=True)
+        print(f"Indexes applied (version {INDEX_VERSION})")
+        return 0
+    
+    if command == "report":
+        print(f"Index version: applied={await get_applied_version()} defined={INDEX_VERSION}")
+        problems = False
+        for name, entry in (await index_report()).items():
+            print(f"{name}:")
+            for key in ("missing", "unused", "unmanaged"):
+                print(f"  {key}: {', '.join(entry[key]) or '-'}")
+            problems = problems or bool(entry["missing"])
+        return 1 if problems else 0
+    
+    # explain
+    exit_code = 0
+    for result in await explain_hot_queries():
+        status = "IXSCAN" if result["uses_index"] else "COLLSCAN"
+        print(f"{status:8} {result['collection']}: {result['query']} -> {' > '.join(result['stages'])}")
+        if not result["uses_index"]:
+            exit_code = 1
+    return exit_code
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage PlanWise MongoDB indexes")
+    parser.add_argument("command", choices=["apply", "report", "explain"])
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.command)))
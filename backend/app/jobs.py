@@ -0,0 +1,273 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from .config import settings
+from .database import jobs_collection
+
+# In-process work queue for side effects that don't have to finish before
+# the response (rollups, achievement checks, ...). Jobs are registered
+# coroutine functions referenced by name, so durable mode can persist them
+# in Mongo and pick them up again after a restart.
+#
+# Jobs may be retried, so they must tolerate running more than once. Every
+# job gets an op id that stays the same across its retries; a job whose
+# writes aren't naturally idempotent records current_job_id() on the
+# documents it changes and skips documents that already carry it.
+
+_registry = {}
+_current_job_id = ContextVar("current_job_id", default=None)
+
+def current_job_id() -> Optional[str]:
+    """Op id of the job running in this context, or None outside the queue"""
+    return _current_job_id.get()
+
+def background_job(func):
+    """Register a coroutine function so it can be enqueued by reference"""
+    name = f"{func.__module__}.{func.__qualname__}"
+    func.job_name = name
+    _registry[name] = func
+    return func
+
+class JobQueue:
+    def __init__(
+        self,
+        concurrency: int = 4,
+        max_size: int = 10000,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        durable: bool = False,
+        poll_interval: float = 0.5,
+        lease_seconds: int = 60
+    ):
+        self.concurrency = concurrency
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.durable = durable
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        
+        self._queue = None
+        self._workers = []
+        self._retry_tasks = set()
+        self._running = False
+        
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.inline = 0
+        self.in_flight = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+    
+    @property
+    def running(self) -> bool:
+        return self._running
+    
+    async def start(self):
+        if self._running:
+            return
+        
+        self._running = True
+        if self.durable:
+            self._workers = [asyncio.create_task(self._durable_worker()) for _ in range(self.concurrency)]
+        else:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._workers = [asyncio.create_task(self._memory_worker()) for _ in range(self.concurrency)]
+    
+    async def enqueue(self, func, *args, **kwargs):
+        name = getattr(func, "job_name", None)
+        if name is None:
+            raise ValueError(f"{func!r} is not a registered background job")
+        
+        if not self._running:
+            # No queue (scripts, shutdown): run it now so the work isn't lost
+            await self._run_inline(name, args, kwargs)
+            return
+        
+        if self.durable:
+            await jobs_collection.insert_one({
+                "name": name,
+                "args": list(args),
+                "kwargs": kwargs,
+                "status": "pending",
+                "attempts": 0,
+                "enqueued_at": datetime.utcnow(),
+                "run_after": datetime.utcnow(),
+            })
+            return
+        
+        try:
+            self._queue.put_nowait((name, args, kwargs, 0, time.monotonic(), str(ObjectId())))
+        except asyncio.QueueFull:
+            # Backpressure: the request pays for its own side effect
+            await self._run_inline(name, args, kwargs)
+    
+    async def drain(self, timeout: Optional[float] = None):
+        """Stop taking jobs, finish the queued ones (up to timeout) and stop the workers"""
+        if not self._running:
+            return
+        
+        if self.durable:
+            # Workers stop claiming and finish the job in hand; one cut off
+            # by the timeout is handed back to pending (see _durable_worker)
+            self._running = False
+            _, unfinished = await asyncio.wait(self._workers, timeout=timeout) if self._workers else (set(), set())
+            if unfinished:
+                print(f"Job queue drain timed out with {len(unfinished)} jobs running; they go back to pending")
+        else:
+            try:
+                await asyncio.wait_for(self._settle(), timeout)
+            except asyncio.TimeoutError:
+                print(
+                    f"Job queue drain timed out with {self._queue.qsize()} jobs queued "
+                    f"and {len(self._retry_tasks)} waiting to retry; they are dropped"
+                )
+            self._running = False
+        
+        for task in list(self._workers) + list(self._retry_tasks):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retry_tasks, return_exceptions=True)
+        self._workers = []
+        self._retry_tasks.clear()
+    
+    async def _settle(self):
+        # A retry waiting out its delay isn't in the queue yet, so wait for
+        # the retries too and for the queue again once they're back in it
+        while True:
+            await self._queue.join()
+            if not self._retry_tasks:
+                return
+            await asyncio.gather(*self._retry_tasks, return_exceptions=True)
+    
+    async def stats(self) -> dict:
+        if self.durable:
+            depth = await jobs_collection.count_documents({"status": "pending"})
+        else:
+            depth = self._queue.qsize() if self._queue else 0
+        
+        return {
+            "mode": "durable" if self.durable else "memory",
+            "running": self._running,
+            "depth": depth,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "inline": self.inline,
+            "last_lag_seconds": round(self.last_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4),
+        }
+    
+    async def _run(self, name: str, args, kwargs, job_id: str):
+        token = _current_job_id.set(job_id)
+        try:
+            await _registry[name](*args, **kwargs)
+        finally:
+            _current_job_id.reset(token)
+    
+    async def _run_inline(self, name: str, args, kwargs):
+        # The request's own write has already happened, so a failed side
+        # effect is logged like a worker failure rather than failing the request
+        self.inline += 1
+        try:
+            await self._run(name, args, kwargs, str(ObjectId()))
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Job {name} failed inline: {e}")
+    
+    def _record_lag(self, lag: float):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+    
+    async def _memory_worker(self):
+        while True:
+            name, args, kwargs, attempt, enqueued_at, job_id = await self._queue.get()
+            self._record_lag(time.monotonic() - enqueued_at)
+            self.in_flight += 1
+            try:
+                await self._run(name, args, kwargs, job_id)
+                self.processed += 1
+            except Exception as e:
+                if attempt < self.max_retries:
+                    self.retried += 1
+                    retry = asyncio.create_task(self._retry_later(name, args, kwargs, attempt + 1, job_id))
+                    self._retry_tasks.add(retry)
+                    retry.add_done_callback(self._retry_tasks.discard)
+                else:
+                    self.failed += 1
+                    print(f"Job {name} failed after {attempt + 1} attempts: {e}")
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+    
+    async def _retry_later(self, name: str, args, kwargs, attempt: int, job_id: str):
+        await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+        await self._queue.put((name, args, kwargs, attempt, time.monotonic(), job_id))
+    
+    async def _durable_worker(self):
+        while self._running:
+            now = datetime.utcnow()
+            # A running job whose lease expired belongs to a worker that died
+            # (or outlived the lease); any worker may claim it again
+            job = await jobs_collection.find_one_and_update(
+                {"$or": [
+                    {"status": "pending", "run_after": {"$lte": now}},
+                    {"status": "running", "locked_at": {"$lt": now - timedelta(seconds=self.lease_seconds)}},
+                ]},
+                {"$set": {"status": "running", "locked_at": now}, "$inc": {"attempts": 1}},
+                sort=[("run_after", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            
+            self._record_lag((now - job["enqueued_at"]).total_seconds())
+            self.in_flight += 1
+            try:
+                await self._run(job["name"], job.get("args", []), job.get("kwargs", {}), str(job["_id"]))
+                await jobs_collection.delete_one({"_id": job["_id"]})
+                self.processed += 1
+            except asyncio.CancelledError:
+                # Shutdown cut the job off: hand it back now rather than
+                # leaving it running until the lease expires
+                await jobs_collection.update_one(
+                    {"_id": job["_id"], "locked_at": now},
+                    {"$set": {"status": "pending"}, "$unset": {"locked_at": ""}, "$inc": {"attempts": -1}}
+                )
+                raise
+            except Exception as e:
+                if job["attempts"] <= self.max_retries:
+                    self.retried += 1
+                    delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+                    await jobs_collection.update_one({"_id": job["_id"]}, {"$set": {
+                        "status": "pending",
+                        "run_after": datetime.utcnow() + timedelta(seconds=delay),
+                        "last_error": str(e),
+                    }})
+                else:
+                    self.failed += 1
+                    await jobs_collection.update_one(
+                        {"_id": job["_id"]},
+                        {"$set": {"status": "failed", "last_error": str(e)}}
+                    )
+                    print(f"Job {job['name']} failed after {job['attempts']} attempts: {e}")
+            finally:
+                self.in_flight -= 1
+
+job_queue = JobQueue(
+    concurrency=settings.JOB_QUEUE_CONCURRENCY,
+    max_size=settings.JOB_QUEUE_MAX_SIZE,
+    max_retries=settings.JOB_MAX_RETRIES,
+    retry_delay=settings.JOB_RETRY_DELAY_SECONDS,
+    durable=settings.JOB_QUEUE_DURABLE,
+)
+
+async def enqueue(func, *args, **kwargs):
+    await job_queue.enqueue(func, *args, **kwargs)
@@ -1,13 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from .routers import auth, users, tasks, mood, sleep, skills, analytics, campus
+from .routers import auth, users, tasks, mood, sleep, skills, analytics, campus, export, stream
 from .config import settings
+from .auth import password_executor, password_queue_depth, user_cache
+from .warmup import readiness, warm_up
+from .jobs import job_queue
+from .pagination import NEXT_CURSOR_HEADER
+from .responses import FastJSONResponse
+from .metrics import MetricsMiddleware, pool_checkout_wait, register_gauge, render_metrics
+from .database import pool_stats
+from .stream import stream_hub
+from .stats import ensure_rollups
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Failed steps are logged and reported by /ready, never raised, so the
+    # API still comes up when e.g. the index build fails
+    await warm_up()
+    await job_queue.start()
+    await stream_hub.start()
+    # Not a warmup step: a full rebuild can outlast the step timeout, and
+    # the API serves (slightly stale) analytics meanwhile
+    rollups = asyncio.create_task(ensure_rollups()) if settings.REBUILD_ROLLUPS_ON_STARTUP else None
+    yield
+    if rollups is not None:
+        # A rebuild cut short keeps its lease and resumes once it expires
+        rollups.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await rollups
+    await stream_hub.stop()
+    await job_queue.drain(timeout=settings.JOB_DRAIN_TIMEOUT_SECONDS)
+    password_executor.shutdown(wait=False, cancel_futures=True)
 
 app = FastAPI(
     title="PlanWise API",
     description="AI-Powered Student Productivity Platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
 )
 
 # Session middleware - required for OAuth
@@ -23,8 +57,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Metrics middleware - only installed when enabled, so it costs nothing otherwise
+if settings.METRICS_ENABLED or settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(
+        MetricsMiddleware,
+        record=settings.METRICS_ENABLED,
+        server_timing=settings.SERVER_TIMING_ENABLED,
+    )
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -34,6 +77,8 @@ app.include_router(sleep.router)
 app.include_router(skills.router)
 app.include_router(analytics.router)
 app.include_router(campus.router)
+app.include_router(export.router)
+app.include_router(stream.router)
 
 @app.get("/")
 def root():
@@ -47,3 +92,43 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def ready_check():
+    # Liveness is /health; this says whether the worker finished warming up
+    # and can reach Mongo, so a deploy only gets traffic once it's warm
+    status = await readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/health/jobs")
+async def job_queue_health():
+    return await job_queue.stats()
+
+@app.get("/health/stream")
+def stream_health():
+    return stream_hub.stats()
+
+@app.get("/health/db")
+def database_health():
+    # Connection pool usage in this worker, for sizing MONGO_MAX_POOL_SIZE
+    return pool_stats.snapshot()
+
+async def _job_queue_gauges():
+    stats = await job_queue.stats()
+    return {(key,): stats[key] for key in ("depth", "in_flight", "processed", "failed", "retried", "last_lag_seconds")}
+
+if settings.METRICS_ENABLED:
+    register_gauge("planwise_job_queue", "Background job queue state", ("stat",), _job_queue_gauges)
+    register_gauge("planwise_user_cache", "User cache hits, misses and size", ("stat",),
+                   lambda: {(key,): value for key, value in user_cache.stats().items()})
+    register_gauge("planwise_password_queue_depth", "Password hash jobs queued or running", (),
+                   lambda: {(): password_queue_depth()})
+    register_gauge("planwise_db_pool", "Mongo connection pool: connections, checkouts and waits", ("stat",),
+                   lambda: {(key,): value for key, value in pool_stats.snapshot().items()})
+    pool_stats.wait_observer = lambda seconds: pool_checkout_wait.observe((), seconds)
+    register_gauge("planwise_stream", "Open event streams and events published", ("stat",),
+                   lambda: {(key,): value for key, value in stream_hub.stats().items() if key != "backend"})
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(await render_metrics(), media_type="text/plain; version=0.0.4")
+
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import defaultdict
+from .database import track_commands
+
+# Request and DB metrics in Prometheus text format. The middleware is only
+# installed when METRICS_ENABLED or SERVER_TIMING_ENABLED is set, so a
+# disabled deployment pays nothing per request.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Checkouts from a warm pool take microseconds; milliseconds mean waiting
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values = defaultdict(float)
+    
+    def inc(self, labels: tuple, amount: float = 1):
+        self.values[labels] += amount
+    
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_labels(label_names, labels)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.counts = {}
+        self.sums = defaultdict(float)
+        # Pool checkout waits are observed from Motor's executor threads
+        self._lock = threading.Lock()
+    
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1  # +Inf
+            self.sums[labels] += value
+    
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), self.sums[labels]) for labels, counts in self.counts.items()]
+        for labels, counts, total in snapshot:
+            for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+                lines.append(f"{self.name}_bucket{_labels(label_names + ('le',), labels + (bound,))} {count}")
+            lines.append(f"{self.name}_sum{_labels(label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(label_names, labels)} {counts[-1]}")
+        return lines
+
+def _labels(names: tuple, values: tuple) -> str:
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+REQUEST_LABELS = ("method", "route", "status")
+ROUTE_LABELS = ("method", "route")
+
+request_latency = Histogram("planwise_http_request_duration_seconds", "Request latency")
+db_commands = Counter("planwise_db_commands_total", "Mongo commands issued")
+db_time = Counter("planwise_db_duration_seconds_total", "Time spent in Mongo commands")
+db_documents = Counter("planwise_db_documents_returned_total", "Documents returned by Mongo")
+pool_checkout_wait = Histogram(
+    "planwise_db_pool_checkout_wait_seconds", "Time waiting to check a connection out of the Mongo pool", POOL_WAIT_BUCKETS
+)
+
+# Extra gauges collected at scrape time: name -> callable returning {labels: value}
+_gauges = {}
+
+def register_gauge(name: str, help_text: str, label_names: tuple, collect):
+    _gauges[name] = (help_text, label_names, collect)
+
+async def render_metrics() -> str:
+    lines = request_latency.render(REQUEST_LABELS)
+    lines += db_commands.render(ROUTE_LABELS)
+    lines += db_time.render(ROUTE_LABELS)
+    lines += db_documents.render(ROUTE_LABELS)
+    lines += pool_checkout_wait.render(())
+    
+    for name, (help_text, label_names, collect) in _gauges.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        values = collect()
+        if hasattr(values, "__await__"):
+            values = await values
+        for labels, value in values.items():
+            lines.append(f"{name}{_labels(label_names, labels) if label_names else ''} {value}")
+    
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and DB usage per route template"""
+    
+    def __init__(self, app, record: bool = True, server_timing: bool = False):
+        self.app = app
+        self.record = record
+        self.server_timing = server_timing
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = 500
+        headers_sent_at = None
+        event_stream = False
+        
+        async def send_wrapper(message):
+            nonlocal status, headers_sent_at, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers_sent_at = time.perf_counter()
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+                if self.server_timing:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", (
+                        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} commands", '
+                        f'app;dur={elapsed:.1f}'
+                    ).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+        
+        with track_commands() as stats:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if self.record:
+                    # An event stream stays open for as long as the client
+                    # is connected, so its latency is the time to its headers
+                    end = headers_sent_at if event_stream else time.perf_counter()
+                    self._observe(scope, status, end - start, stats)
+    
+    def _observe(self, scope, status: int, elapsed: float, stats):
+        # Route templates keep the label set bounded; unmatched paths share one label
+        route = getattr(scope.get("route"), "path", "unmatched")
+        labels = (scope["method"], route)
+        request_latency.observe(labels + (status,), elapsed)
+        db_commands.inc(labels, stats.count)
+        db_time.inc(labels, stats.duration)
+        db_documents.inc(labels, stats.documents)
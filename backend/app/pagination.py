@@ -0,0 +1,93 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Response
+from pymongo import ASCENDING, DESCENDING
+from .config import settings
+from .documents import model_projection
+from .responses import FastJSONResponse
+
+# Keyset pagination on (sort_field, _id). The cursor is an opaque token
+# holding the sort value and id of the last document on the page.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(value: datetime, object_id: ObjectId) -> str:
+    raw = json.dumps({"v": value.isoformat(), "id": str(object_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data["v"]), ObjectId(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_fields(fields: Optional[str], model) -> Optional[list]:
+    """Validate a comma separated `fields=` parameter against a response model"""
+    if not fields:
+        return None
+    
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    return requested
+
+async def fetch_page(
+    collection,
+    model,
+    query: dict,
+    sort_field: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[list] = None,
+    descending: bool = True
+) -> tuple:
+    """Return one page of `model` documents (or just `fields`) and the cursor for the next page"""
+    direction = DESCENDING if descending else ASCENDING
+    
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = "$lt" if descending else "$gt"
+        query = {"$and": [query, {"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "_id": {op: last_id}}
+        ]}]}
+    
+    # Documents come back already mapped; the sort key is needed for the cursor
+    projection = model_projection(model, fields)
+    projection[sort_field] = 1
+    
+    docs = await collection.find(query, projection).sort(
+        [(sort_field, direction), ("_id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs.pop()
+        next_cursor = encode_cursor(docs[-1][sort_field], ObjectId(docs[-1]["id"]))
+    
+    if fields is not None and sort_field not in fields:
+        for doc in docs:
+            doc.pop(sort_field, None)
+    
+    return docs, next_cursor
+
+def page_response(response: Response, docs: list, next_cursor: Optional[str], partial: bool = False):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    
+    if partial or settings.TRUSTED_RESPONSES:
+        # Partial documents can't satisfy the response model and trusted ones
+        # don't need it, so skip validation and encode them directly, keeping
+        # the headers already set on the response
+        return FastJSONResponse(content=docs, headers=dict(response.headers))
+    
+    return docs
@@ -0,0 +1,30 @@
+import json
+from datetime import date, datetime
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+# Fast JSON responses. orjson is optional (pip install orjson); without it
+# FastJSONResponse falls back to the stdlib encoder with the same output.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    # orjson encodes datetime itself and only asks about ObjectId
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response that encodes datetime and ObjectId values without jsonable_encoder"""
+    
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
@@ -1,82 +1,89 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+import asyncio
 from datetime import datetime, timedelta
-from typing import Dict
-from ..database import tasks_collection, mood_logs_collection, sleep_logs_collection, user_skills_collection
+from typing import Dict, Literal, Optional
+from collections import defaultdict
+from ..database import secondary_reads, tasks_collection, user_daily_stats_collection, user_skills_collection
 from ..auth import get_current_user
+from ..stats import day_start, get_daily_stats
+from ..versions import get_data_version, user_reads
+from ..conditional import check_conditional, weak_etag
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
-@router.get("/dashboard", response_model=Dict)
-async def get_dashboard_analytics(
-    days: int = 7,
-    current_user: dict = Depends(get_current_user)
-):
+PERIOD_FIELDS = [
+    "tasks_completed",
+    "mood_count", "mood_score_sum", "focus_level_sum",
+    "sleep_count", "hours_slept_sum", "sleep_debt_sum"
+]
+
+async def _task_totals(user_id: str, tasks) -> tuple:
+    # Both counts are answered from the (user_id, completed, updated_at) index
+    return await asyncio.gather(
+        tasks.count_documents({"user_id": user_id}),
+        tasks.count_documents({"user_id": user_id, "completed": True})
+    )
+
+async def _period_totals(user_id: str, start_date: datetime, daily_stats) -> dict:
+    # Summed from the daily rollups, one small document per active day
+    totals = {field: 0 for field in PERIOD_FIELDS}
+    for row in await get_daily_stats(user_id, start_date, collection=daily_stats):
+        for field in PERIOD_FIELDS:
+            totals[field] += row.get(field, 0)
+    return totals
+
+async def _skill_totals(user_id: str, skills) -> dict:
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "total_practice_time": {"$sum": {"$ifNull": ["$total_practice_time", 0]}}
+        }}
+    ]
+    async for row in skills.aggregate(pipeline):
+        return row
+    return {"count": 0, "total_practice_time": 0}
+
+async def build_dashboard(current_user: dict, days: int, modified_at: Optional[datetime] = None) -> dict:
+    """Build the dashboard payload from task counts, daily rollups and skills, run concurrently"""
+    user_id = current_user["id"]
+    # Rollups are per day, so the period starts at midnight of its first day
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    # Tasks analytics
-    total_tasks = await tasks_collection.count_documents({"user_id": current_user["id"]})
-    completed_tasks = await tasks_collection.count_documents({
-        "user_id": current_user["id"],
-        "completed": True
-    })
-    pending_tasks = total_tasks - completed_tasks
-    
-    recent_completed = await tasks_collection.count_documents({
-        "user_id": current_user["id"],
-        "completed": True,
-        "updated_at": {"$gte": start_date}
-    })
-    
-    # Mood analytics
-    mood_logs = []
-    async for log in mood_logs_collection.find({
-        "user_id": current_user["id"],
-        "created_at": {"$gte": start_date}
-    }):
-        mood_logs.append(log)
-    
-    avg_mood = sum(log.get("mood_score", 0) for log in mood_logs) / len(mood_logs) if mood_logs else 0
-    avg_focus = sum(log.get("focus_level", 0) for log in mood_logs) / len(mood_logs) if mood_logs else 0
-    
-    # Sleep analytics
-    sleep_logs = []
-    async for log in sleep_logs_collection.find({
-        "user_id": current_user["id"],
-        "created_at": {"$gte": start_date}
-    }):
-        sleep_logs.append(log)
-    
-    total_sleep = sum(log.get("hours_slept", 0) for log in sleep_logs)
-    avg_sleep = total_sleep / len(sleep_logs) if sleep_logs else 0
-    total_sleep_debt = sum(log.get("sleep_debt", 0) for log in sleep_logs)
+    (total_tasks, completed_tasks), period, skills = await asyncio.gather(
+        _task_totals(user_id, secondary_reads(tasks_collection, modified_at)),
+        _period_totals(user_id, start_date, secondary_reads(user_daily_stats_collection, modified_at)),
+        _skill_totals(user_id, secondary_reads(user_skills_collection, modified_at))
+    )
     
-    # Skills analytics
-    total_skills = await user_skills_collection.count_documents({"user_id": current_user["id"]})
-    total_practice_time = 0
-    async for skill in user_skills_collection.find({"user_id": current_user["id"]}):
-        total_practice_time += skill.get("total_practice_time", 0)
+    mood_count = period["mood_count"]
+    sleep_count = period["sleep_count"]
+    avg_mood = period["mood_score_sum"] / mood_count if mood_count else 0
+    avg_focus = period["focus_level_sum"] / mood_count if mood_count else 0
+    avg_sleep = period["hours_slept_sum"] / sleep_count if sleep_count else 0
     
     return {
         "tasks": {
             "total": total_tasks,
             "completed": completed_tasks,
-            "pending": pending_tasks,
-            "completed_this_period": recent_completed,
+            "pending": total_tasks - completed_tasks,
+            "completed_this_period": period["tasks_completed"],
             "completion_rate": (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         },
         "mood": {
             "average_mood_score": round(avg_mood, 1),
             "average_focus_level": round(avg_focus, 1),
-            "logs_count": len(mood_logs)
+            "logs_count": mood_count
         },
         "sleep": {
             "average_hours": round(avg_sleep, 1),
-            "total_sleep_debt": round(total_sleep_debt, 1),
-            "logs_count": len(sleep_logs)
+            "total_sleep_debt": round(period["sleep_debt_sum"], 1),
+            "logs_count": sleep_count
         },
         "skills": {
-            "total_skills": total_skills,
-            "total_practice_minutes": total_practice_time
+            "total_skills": skills["count"],
+            "total_practice_minutes": skills["total_practice_time"]
         },
         "gamification": {
             "total_points": current_user.get("total_points", 0),
@@ -86,27 +93,73 @@ async def get_dashboard_analytics(
         }
     }
 
+@router.get("/dashboard", response_model=Dict)
+async def get_dashboard_analytics(
+    request: Request,
+    response: Response,
+    days: int = 7,
+    current_user: dict = Depends(get_current_user)
+):
+    # Every write and rollup update bumps the version; the period window and
+    # streak move at midnight
+    version, modified_at = await get_data_version(current_user["id"])
+    today = day_start(datetime.utcnow())
+    etag = weak_etag("dashboard", current_user["id"], version, today.date(), request.url.query)
+    
+    not_modified = check_conditional(request, response, etag, max(modified_at or today, today))
+    if not_modified is not None:
+        return not_modified
+    return await build_dashboard(current_user, days, modified_at)
+
+BUCKET_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",  # Keyed by the Monday that starts the week
+    "month": "%Y-%m"
+}
+
+BUCKET_RESPONSE_KEYS = {
+    "day": "daily_productivity",
+    "week": "weekly_productivity",
+    "month": "monthly_productivity"
+}
+
+def _bucket_start(value: datetime, bucket: str) -> datetime:
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def _next_bucket(value: datetime, bucket: str) -> datetime:
+    if bucket == "week":
+        return value + timedelta(days=7)
+    if bucket == "month":
+        return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return value + timedelta(days=1)
+
 @router.get("/productivity-trends", response_model=Dict)
 async def get_productivity_trends(
     days: int = 30,
+    bucket: Literal["day", "week", "month"] = "day",
     current_user: dict = Depends(get_current_user)
 ):
-    start_date = datetime.utcnow() - timedelta(days=days)
+    window_start = _bucket_start(datetime.utcnow() - timedelta(days=days), "day")
+    window_end = window_start + timedelta(days=days)
+    
+    # Completions per day come from the rollups; coarser buckets are summed here
+    counts = defaultdict(int)
+    daily_stats = await user_reads(user_daily_stats_collection, current_user["id"])
+    for row in await get_daily_stats(current_user["id"], window_start, window_end, collection=daily_stats):
+        counts[_bucket_start(row["day"], bucket)] += row.get("tasks_completed", 0)
     
-    daily_stats = {}
-    for i in range(days):
-        day = start_date + timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        completed = await tasks_collection.count_documents({
-            "user_id": current_user["id"],
-            "completed": True,
-            "updated_at": {"$gte": day_start, "$lt": day_end}
-        })
-        
-        daily_stats[day.strftime("%Y-%m-%d")] = {
-            "completed_tasks": completed
+    # Fill in empty buckets so the series has no gaps
+    stats = {}
+    current = _bucket_start(window_start, bucket)
+    while current < window_end:
+        stats[current.strftime(BUCKET_FORMATS[bucket])] = {
+            "completed_tasks": counts.get(current, 0)
         }
+        current = _next_bucket(current, bucket)
     
-    return {"daily_productivity": daily_stats}
+    return {BUCKET_RESPONSE_KEYS[bucket]: stats}
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
 from datetime import timedelta, datetime
 from authlib.integrations.starlette_client import OAuth
 import httpx
 from ..database import users_collection
 from ..schemas import UserCreate, UserLogin, Token, UserResponse
-from ..auth import get_password_hash, verify_password, create_access_token
+from ..documents import to_api
+from ..auth import (
+    get_password_hash, verify_password, create_access_token, cache_user, invalidate_user,
+    get_current_user, oauth2_scheme, verify_token, revoke_token
+)
 from ..config import settings
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import secrets
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
@@ -47,7 +52,7 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Username already taken")
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     user_dict = {
         "email": user_data.email,
         "username": user_data.username,
@@ -64,10 +69,13 @@ async def register(user_data: UserCreate):
         "created_at": datetime.utcnow()
     }
     
-    result = await users_collection.insert_one(user_dict)
-    user_dict["id"] = str(result.inserted_id)
-    user_dict.pop("_id", None)
-    user_dict.pop("hashed_password", None)
+    try:
+        await users_collection.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration; the unique indexes caught it
+        raise HTTPException(status_code=400, detail="Email or username already registered")
+    to_api(user_dict)
+    await cache_user(user_dict)
     
     # Create access token
     access_token = create_access_token(
@@ -85,15 +93,14 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     user = await users_collection.find_one({"email": credentials.email})
     
-    if not user or not verify_password(credentials.password, user["hashed_password"]):
+    if not user or not await verify_password(credentials.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    user["id"] = str(user["_id"])
-    user.pop("_id", None)
-    user.pop("hashed_password", None)
+    to_api(user)
+    await cache_user(user)
     
     access_token = create_access_token(
         data={"sub": user["id"]},
@@ -106,6 +113,20 @@ async def login(credentials: UserLogin):
         "user": user
     }
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme), current_user: dict = Depends(get_current_user)):
+    """Revoke the token used for this request"""
+    await revoke_token(token, await verify_token(token))
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(current_user: dict = Depends(get_current_user)):
+    """Revoke every token issued to the current user so far"""
+    await users_collection.update_one(
+        {"_id": ObjectId(current_user["id"])},
+        {"$set": {"tokens_valid_after": datetime.utcnow()}}
+    )
+    await invalidate_user(current_user["id"])
+
 # Google OAuth endpoints
 @router.get("/google/login")
 async def google_login(request: Request):
@@ -186,7 +207,7 @@ async def google_callback(request: Request):
                 "email": email,
                 "username": username,
                 "full_name": user_info.get('name') or user_info.get('given_name', ''),
-                "hashed_password": get_password_hash(secrets.token_urlsafe(32)),
+                "hashed_password": await get_password_hash(secrets.token_urlsafe(32)),
                 "bio": None,
                 "total_points": 0,
                 "current_streak": 0,
@@ -199,18 +220,16 @@ async def google_callback(request: Request):
                 "oauth_id": user_info.get('sub'),
                 "created_at": datetime.utcnow()
             }
-            result = await users_collection.insert_one(user_dict)
-            user_dict["id"] = str(result.inserted_id)
-            user_dict.pop("_id", None)
-            user_dict.pop("hashed_password", None)
+            await users_collection.insert_one(user_dict)
+            to_api(user_dict)
             user = user_dict
             print(f"Created new user: {user['id']}")
         else:
-            user["id"] = str(user["_id"])
-            user.pop("_id", None)
-            user.pop("hashed_password", None)
+            to_api(user)
             print(f"Found existing user: {user['id']}")
         
+        await cache_user(user)
+        
         # Create access token
         access_token = create_access_token(
             data={"sub": user["id"]},
@@ -269,11 +288,19 @@ async def github_callback(request: Request):
         
         if not user:
             # Create new user from OAuth
+            username = user_info.get('login', email.split('@')[0])
+            
+            # Usernames are unique; GitHub logins can clash with local accounts
+            counter = 0
+            while await users_collection.find_one({"username": username}):
+                username = user_info.get('login', email.split('@')[0]) + "_" + secrets.token_hex(3) + str(counter)
+                counter += 1
+            
             user_dict = {
                 "email": email,
-                "username": user_info.get('login', email.split('@')[0]),
+                "username": username,
                 "full_name": user_info.get('name') or user_info.get('login'),
-                "hashed_password": get_password_hash(secrets.token_urlsafe(32)),
+                "hashed_password": await get_password_hash(secrets.token_urlsafe(32)),
                 "bio": user_info.get('bio'),
                 "total_points": 0,
                 "current_streak": 0,
@@ -286,15 +313,13 @@ async def github_callback(request: Request):
                 "oauth_id": str(user_info.get('id')),
                 "created_at": datetime.utcnow()
             }
-            result = await users_collection.insert_one(user_dict)
-            user_dict["id"] = str(result.inserted_id)
-            user_dict.pop("_id", None)
-            user_dict.pop("hashed_password", None)
+            await users_collection.insert_one(user_dict)
+            to_api(user_dict)
             user = user_dict
         else:
-            user["id"] = str(user["_id"])
-            user.pop("_id", None)
-            user.pop("hashed_password", None)
+            to_api(user)
+        
+        await cache_user(user)
         
         # Create access token
         access_token = create_access_token(
@@ -307,5 +332,7 @@ async def github_callback(request: Request):
             url=f"{settings.FRONTEND_URL}/oauth-callback?token={access_token}&user={user['id']}"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"OAuth error: {str(e)}")
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from datetime import datetime, timezone
 from typing import List, Optional
-from ..database import campus_events_collection
+from ..database import campus_events_collection, secondary_reads
 from ..schemas import CampusEventCreate, CampusEventResponse
 from ..auth import get_current_user
+from ..config import settings
+from ..documents import model_projection, to_api
+from ..pagination import fetch_page, page_response, parse_fields
+from ..campus_feed import get_campus_feed, invalidate_campus_feed
+from ..conditional import etag_matches, not_modified, set_validators, weak_etag
+from ..stats import day_start
+from ..stream import stream_hub, CAMPUS_EVENT
 from bson import ObjectId
 
 router = APIRouter(prefix="/api/campus", tags=["campus"])
@@ -17,42 +24,80 @@ async def create_event(
     event_dict["created_by"] = current_user["id"]
     event_dict["created_at"] = datetime.utcnow()
     
-    result = await campus_events_collection.insert_one(event_dict)
-    event_dict["id"] = str(result.inserted_id)
-    event_dict.pop("_id", None)
+    await campus_events_collection.insert_one(event_dict)
+    invalidate_campus_feed()
+    to_api(event_dict)
+    await stream_hub.publish(CAMPUS_EVENT, {"action": "created", "event": event_dict})
     
     return event_dict
 
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored dates are naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 @router.get("/events", response_model=List[CampusEventResponse])
 async def get_events(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    query = {}
+    field_list = parse_fields(fields, CampusEventResponse)
+    # Upcoming events by default; `from` reaches back to past ones, `to` is exclusive
+    start = _naive_utc(from_date) or day_start(datetime.utcnow())
+    end = _naive_utc(to_date)
+    
+    feed = await get_campus_feed()
+    if start >= feed.window_start:
+        # The page is fully determined by the feed version and the query string
+        etag = weak_etag(feed.version, request.url.query)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        page = feed.page(category, start, end, limit, cursor)
+        if page is not None:
+            events, next_cursor = page
+            if field_list is not None:
+                events = [{"id": event["id"], **{field: event.get(field) for field in field_list}} for event in events]
+            set_validators(response, etag)
+            return page_response(response, events, next_cursor, partial=field_list is not None)
+    
+    # Past events, or beyond what the feed holds: served by the (category, event_date) index
+    query = {"event_date": {"$gte": start}}
+    if end is not None:
+        query["event_date"]["$lt"] = end
     if category:
         query["category"] = category
     
-    events = []
-    async for event in campus_events_collection.find(query).sort("event_date", 1):
-        event["id"] = str(event["_id"])
-        event.pop("_id", None)
-        events.append(event)
+    # Events are listed soonest first, so page forwards on event_date. Shared
+    # and mostly past, so a secondary may serve them; new events show up on
+    # the feed above, which reloads from the primary
+    events, next_cursor = await fetch_page(
+        secondary_reads(campus_events_collection), CampusEventResponse, query, "event_date", limit, cursor, field_list,
+        descending=False
+    )
     
-    return events
+    return page_response(response, events, next_cursor, partial=field_list is not None)
 
 @router.get("/events/{event_id}", response_model=CampusEventResponse)
 async def get_event(
     event_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    event = await campus_events_collection.find_one({"_id": ObjectId(event_id)})
+    event = await campus_events_collection.find_one(
+        {"_id": ObjectId(event_id)}, model_projection(CampusEventResponse)
+    )
     
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    event["id"] = str(event["_id"])
-    event.pop("_id", None)
-    
     return event
 
 @router.delete("/events/{event_id}", status_code=204)
@@ -70,5 +115,7 @@ async def delete_event(
         raise HTTPException(status_code=403, detail="Not authorized to delete this event")
     
     await campus_events_collection.delete_one({"_id": ObjectId(event_id)})
+    invalidate_campus_feed()
+    await stream_hub.publish(CAMPUS_EVENT, {"action": "deleted", "id": event_id})
     
     return None
@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Literal, Optional
+from ..database import (
+    tasks_collection, mood_logs_collection, sleep_logs_collection,
+    user_skills_collection, user_achievements_collection
+)
+from ..schemas import TaskResponse, MoodLogResponse, SleepLogResponse, SkillResponse
+from ..auth import get_current_user
+from ..config import settings
+from ..documents import fields_projection
+from ..versions import user_reads
+from bson import ObjectId
+import csv
+import io
+import json
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+# Exportable collections and the columns written for each
+EXPORT_SOURCES = {
+    "tasks": (tasks_collection, list(TaskResponse.model_fields)),
+    "mood_logs": (mood_logs_collection, list(MoodLogResponse.model_fields)),
+    "sleep_logs": (sleep_logs_collection, list(SleepLogResponse.model_fields)),
+    "skills": (user_skills_collection, list(SkillResponse.model_fields)),
+    "achievements": (user_achievements_collection, ["id", "user_id", "achievement_id", "unlocked_at"]),
+}
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _to_row(doc: dict, columns: list) -> dict:
+    return {column: doc.get(column) for column in columns}
+
+async def _iter_batches(source: str, user_id: str):
+    """Yield lists of export rows, holding at most one cursor batch in memory"""
+    collection, columns = EXPORT_SOURCES[source]
+    collection = await user_reads(collection, user_id)
+    projection = fields_projection(columns)
+    
+    batch = []
+    async for doc in collection.find({"user_id": user_id}, projection).batch_size(settings.EXPORT_BATCH_SIZE):
+        batch.append(_to_row(doc, columns))
+        if len(batch) >= settings.EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
+
+async def _stream_ndjson(sources: list, user_id: str):
+    for source in sources:
+        async for batch in _iter_batches(source, user_id):
+            lines = [
+                json.dumps({"type": source, "data": row}, default=_encode_value, ensure_ascii=False)
+                for row in batch
+            ]
+            yield "\n".join(lines) + "\n"
+
+async def _stream_csv(source: str, user_id: str):
+    columns = EXPORT_SOURCES[source][1]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    
+    async for batch in _iter_batches(source, user_id):
+        for row in batch:
+            writer.writerow({key: _encode_value(value) if isinstance(value, (datetime, ObjectId)) else value
+                             for key, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("")
+async def export_data(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    collections: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the user's full history without loading it into memory"""
+    sources = [name.strip() for name in collections.split(",") if name.strip()] if collections else list(EXPORT_SOURCES)
+    
+    unknown = [name for name in sources if name not in EXPORT_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(unknown)}")
+    
+    filename = f"planwise-export-{datetime.utcnow().strftime('%Y%m%d')}"
+    
+    if format == "csv":
+        # CSV has one header row, so each export covers a single collection
+        if len(sources) != 1:
+            raise HTTPException(status_code=400, detail="CSV export requires exactly one collection")
+        return StreamingResponse(
+            _stream_csv(sources[0], current_user["id"]),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}-{sources[0]}.csv"'}
+        )
+    
+    return StreamingResponse(
+        _stream_ndjson(sources, current_user["id"]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'}
+    )
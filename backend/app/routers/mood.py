@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 from ..database import mood_logs_collection
 from ..schemas import MoodLogCreate, MoodLogResponse
 from ..auth import get_current_user
+from ..config import settings
+from ..documents import model_projection, to_api
+from ..pagination import fetch_page, page_response, parse_fields
+from ..stats import record_mood
+from ..jobs import enqueue
+from ..versions import bump_data_version, get_data_version, user_reads
+from ..conditional import check_conditional, weak_etag
+from ..stream import stream_hub, MOOD
+from .. import events
 from bson import ObjectId
 
 router = APIRouter(prefix="/api/mood", tags=["mood"])
@@ -17,41 +26,57 @@ async def log_mood(
     mood_dict["user_id"] = current_user["id"]
     mood_dict["created_at"] = datetime.utcnow()
     
-    result = await mood_logs_collection.insert_one(mood_dict)
-    mood_dict["id"] = str(result.inserted_id)
-    mood_dict.pop("_id", None)
+    await mood_logs_collection.insert_one(mood_dict)
+    await bump_data_version(current_user["id"])
+    await enqueue(record_mood, current_user["id"], dict(mood_dict))
+    await events.publish(events.MOOD_LOGGED, current_user["id"], counters={"mood_logs": 1})
+    to_api(mood_dict)
+    await stream_hub.publish(MOOD, {"log": mood_dict}, current_user["id"])
     
     return mood_dict
 
 @router.get("/", response_model=List[MoodLogResponse])
 async def get_mood_logs(
+    response: Response,
     days: int = 7,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     start_date = datetime.utcnow() - timedelta(days=days)
-    
-    logs = []
-    async for log in mood_logs_collection.find({
+    query = {
         "user_id": current_user["id"],
         "created_at": {"$gte": start_date}
-    }).sort("created_at", -1):
-        log["id"] = str(log["_id"])
-        log.pop("_id", None)
-        logs.append(log)
+    }
+    
+    field_list = parse_fields(fields, MoodLogResponse)
+    logs, next_cursor = await fetch_page(
+        await user_reads(mood_logs_collection, current_user["id"]), MoodLogResponse, query, "created_at", limit, cursor, field_list
+    )
     
-    return logs
+    return page_response(response, logs, next_cursor, partial=field_list is not None)
 
 @router.get("/latest", response_model=MoodLogResponse)
-async def get_latest_mood(current_user: dict = Depends(get_current_user)):
+async def get_latest_mood(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    version, modified_at = await get_data_version(current_user["id"])
+    not_modified = check_conditional(
+        request, response, weak_etag("mood_latest", current_user["id"], version), modified_at
+    )
+    if not_modified is not None:
+        return not_modified
+    
     log = await mood_logs_collection.find_one(
         {"user_id": current_user["id"]},
+        model_projection(MoodLogResponse),
         sort=[("created_at", -1)]
     )
     
     if not log:
         raise HTTPException(status_code=404, detail="No mood logs found")
     
-    log["id"] = str(log["_id"])
-    log.pop("_id", None)
-    
     return log
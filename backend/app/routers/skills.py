@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from datetime import datetime
-from typing import List
-from ..database import user_skills_collection, achievements_collection, user_achievements_collection
+from typing import List, Optional
+from ..database import user_skills_collection, user_achievements_collection
 from ..schemas import SkillCreate, SkillResponse, AchievementResponse
 from ..auth import get_current_user
+from ..achievements import get_achievement_catalog
+from ..config import settings
+from ..documents import model_projection, to_api
+from ..pagination import fetch_page, page_response, parse_fields
+from ..stats import record_practice
+from ..jobs import enqueue
+from ..versions import bump_data_version, user_reads
+from .. import events
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 router = APIRouter(prefix="/api/skills", tags=["skills"])
 
@@ -20,21 +29,27 @@ async def create_skill(
     skill_dict["created_at"] = datetime.utcnow()
     skill_dict["last_practiced"] = None
     
-    result = await user_skills_collection.insert_one(skill_dict)
-    skill_dict["id"] = str(result.inserted_id)
-    skill_dict.pop("_id", None)
+    await user_skills_collection.insert_one(skill_dict)
+    await bump_data_version(current_user["id"])
+    to_api(skill_dict)
     
     return skill_dict
 
 @router.get("/", response_model=List[SkillResponse])
-async def get_skills(current_user: dict = Depends(get_current_user)):
-    skills = []
-    async for skill in user_skills_collection.find({"user_id": current_user["id"]}).sort("created_at", -1):
-        skill["id"] = str(skill["_id"])
-        skill.pop("_id", None)
-        skills.append(skill)
+async def get_skills(
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    field_list = parse_fields(fields, SkillResponse)
+    skills, next_cursor = await fetch_page(
+        await user_reads(user_skills_collection, current_user["id"]),
+        SkillResponse, {"user_id": current_user["id"]}, "created_at", limit, cursor, field_list
+    )
     
-    return skills
+    return page_response(response, skills, next_cursor, partial=field_list is not None)
 
 @router.put("/{skill_id}/practice", response_model=SkillResponse)
 async def log_practice(
@@ -42,47 +57,53 @@ async def log_practice(
     minutes: int,
     current_user: dict = Depends(get_current_user)
 ):
-    skill = await user_skills_collection.find_one({
-        "_id": ObjectId(skill_id),
-        "user_id": current_user["id"]
-    })
-    
-    if not skill:
-        raise HTTPException(status_code=404, detail="Skill not found")
-    
-    new_total = skill.get("total_practice_time", 0) + minutes
-    new_level = (new_total // 60) + 1  # Level up every 60 minutes
-    
-    await user_skills_collection.update_one(
-        {"_id": ObjectId(skill_id)},
+    # Pipeline update: the new total and level are computed server-side, so
+    # concurrent practice logs can't overwrite each other's minutes
+    now = datetime.utcnow()
+    updated_skill = await user_skills_collection.find_one_and_update(
         {
-            "$set": {
-                "total_practice_time": new_total,
-                "current_level": new_level,
-                "last_practiced": datetime.utcnow()
-            }
-        }
+            "_id": ObjectId(skill_id),
+            "user_id": current_user["id"]
+        },
+        [
+            {"$set": {
+                "total_practice_time": {"$add": [{"$ifNull": ["$total_practice_time", 0]}, minutes]},
+                "last_practiced": now
+            }},
+            {"$set": {
+                # Level up every 60 minutes
+                "current_level": {"$add": [{"$toInt": {"$floor": {"$divide": ["$total_practice_time", 60]}}}, 1]}
+            }}
+        ],
+        projection=model_projection(SkillResponse),
+        return_document=ReturnDocument.AFTER
     )
     
-    updated_skill = await user_skills_collection.find_one({"_id": ObjectId(skill_id)})
-    updated_skill["id"] = str(updated_skill["_id"])
-    updated_skill.pop("_id", None)
+    if not updated_skill:
+        raise HTTPException(status_code=404, detail="Skill not found")
+    
+    await bump_data_version(current_user["id"])
+    await enqueue(record_practice, current_user["id"], minutes, now)
+    await events.publish(events.SKILL_PRACTICED, current_user["id"], counters={"practice_minutes": minutes})
     
     return updated_skill
 
 @router.get("/achievements", response_model=List[AchievementResponse])
 async def get_achievements(current_user: dict = Depends(get_current_user)):
-    # Get all available achievements
+    # Catalog comes from the in-process cache; the user's unlocks come from one query
+    catalog = await get_achievement_catalog()
+    
+    unlocked = {}
+    async for user_achievement in user_achievements_collection.find(
+        {"user_id": current_user["id"]},
+        {"achievement_id": 1, "unlocked_at": 1}
+    ):
+        unlocked[user_achievement["achievement_id"]] = user_achievement
+    
     all_achievements = []
-    async for achievement in achievements_collection.find():
-        achievement["id"] = str(achievement["_id"])
-        achievement.pop("_id", None)
-        
-        # Check if user has this achievement
-        user_achievement = await user_achievements_collection.find_one({
-            "user_id": current_user["id"],
-            "achievement_id": achievement["id"]
-        })
+    for achievement in catalog:
+        achievement = dict(achievement)
+        user_achievement = unlocked.get(achievement["id"])
         
         achievement["unlocked"] = user_achievement is not None
         if user_achievement:
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from datetime import datetime, timedelta
-from typing import List
-from ..database import sleep_logs_collection, users_collection
+from typing import List, Optional
+from ..database import sleep_logs_collection
 from ..schemas import SleepLogCreate, SleepLogResponse
 from ..auth import get_current_user
-from bson import ObjectId
+from ..config import settings
+from ..documents import to_api
+from ..pagination import fetch_page, page_response, parse_fields
+from ..stats import record_sleep
+from ..jobs import enqueue
+from ..versions import bump_data_version, user_reads
+from ..stream import stream_hub, SLEEP
+from .. import events
 
 router = APIRouter(prefix="/api/sleep", tags=["sleep"])
 
@@ -17,35 +24,41 @@ async def log_sleep(
     sleep_dict["user_id"] = current_user["id"]
     sleep_dict["created_at"] = datetime.utcnow()
     
-    # Calculate sleep debt
-    user = await users_collection.find_one({"_id": ObjectId(current_user["id"])})
-    daily_goal = user.get("daily_sleep_goal", 8.0)
+    # Calculate sleep debt; the goal comes with the already loaded user
+    daily_goal = current_user.get("daily_sleep_goal", 8.0)
     sleep_debt = max(0, daily_goal - sleep_dict["hours_slept"])
     sleep_dict["sleep_debt"] = sleep_debt
     
-    result = await sleep_logs_collection.insert_one(sleep_dict)
-    sleep_dict["id"] = str(result.inserted_id)
-    sleep_dict.pop("_id", None)
+    await sleep_logs_collection.insert_one(sleep_dict)
+    await bump_data_version(current_user["id"])
+    await enqueue(record_sleep, current_user["id"], dict(sleep_dict))
+    await events.publish(events.SLEEP_LOGGED, current_user["id"], counters={"sleep_logs": 1})
+    to_api(sleep_dict)
+    await stream_hub.publish(SLEEP, {"log": sleep_dict}, current_user["id"])
     
     return sleep_dict
 
 @router.get("/", response_model=List[SleepLogResponse])
 async def get_sleep_logs(
+    response: Response,
     days: int = 7,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     start_date = datetime.utcnow() - timedelta(days=days)
-    
-    logs = []
-    async for log in sleep_logs_collection.find({
+    query = {
         "user_id": current_user["id"],
         "created_at": {"$gte": start_date}
-    }).sort("created_at", -1):
-        log["id"] = str(log["_id"])
-        log.pop("_id", None)
-        logs.append(log)
+    }
+    
+    field_list = parse_fields(fields, SleepLogResponse)
+    logs, next_cursor = await fetch_page(
+        await user_reads(sleep_logs_collection, current_user["id"]), SleepLogResponse, query, "created_at", limit, cursor, field_list
+    )
     
-    return logs
+    return page_response(response, logs, next_cursor, partial=field_list is not None)
 
 @router.get("/debt", response_model=dict)
 async def get_sleep_debt(
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
+from ..auth import get_current_user
+from ..stream import stream_hub
+
+router = APIRouter(prefix="/api", tags=["stream"])
+
+# EventSource can't set headers, so browsers may pass the token as
+# ?access_token= instead of the Authorization header
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    access_token: Optional[str] = None,
+    token: Optional[str] = Depends(optional_oauth2_scheme)
+):
+    token = token or access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    current_user = await get_current_user(request, token)
+    
+    if stream_hub.connections(current_user["id"]) >= stream_hub.max_connections_per_user:
+        raise HTTPException(status_code=429, detail="Too many open streams", headers={"Retry-After": "30"})
+    
+    return StreamingResponse(
+        stream_hub.messages(current_user["id"], resync=request.headers.get("last-event-id") is not None),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Don't let a proxy buffer the stream
+        }
+    )
@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from datetime import datetime
-from typing import List, Optional
-from ..database import tasks_collection, users_collection
-from ..schemas import TaskCreate, TaskUpdate, TaskResponse
-from ..auth import get_current_user
+from itertools import groupby
+from typing import List, NamedTuple, Optional
+from ..database import secondary_reads, tasks_collection
+from ..schemas import TaskCreate, TaskUpdate, TaskResponse, TaskBatchRequest, TaskBatchResponse
+from ..auth import get_current_user, cache_user
+from ..config import settings
+from ..documents import model_projection, to_api
+from ..pagination import fetch_page, page_response, parse_fields
+from ..stats import record_task_completions
+from ..jobs import enqueue
+from ..gamification import apply_progress
+from ..versions import bump_data_version, get_data_version
+from ..conditional import check_conditional, weak_etag
+from ..stream import stream_hub, TASK, TASKS
+from .. import events
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
@@ -49,28 +63,242 @@ async def create_task(
     task_dict["created_at"] = datetime.utcnow()
     task_dict["updated_at"] = datetime.utcnow()
     
-    result = await tasks_collection.insert_one(task_dict)
-    task_dict["id"] = str(result.inserted_id)
-    task_dict.pop("_id", None)
+    await tasks_collection.insert_one(task_dict)
+    await bump_data_version(current_user["id"])
+    to_api(task_dict)
+    await stream_hub.publish(TASK, {"action": "created", "task": task_dict}, current_user["id"])
     
     return task_dict
 
+class _BatchWrite(NamedTuple):
+    position: int  # index into the results list
+    op: object
+    points: int = 0
+    completion: Optional[tuple] = None  # (day, +1/-1) for the daily rollups
+    task: Optional[dict] = None
+    toggle: Optional[bool] = None  # Target completed state; written on its own, guarded on the prior state
+    update: Optional[dict] = None
+
+def _completion_counters(tasks: list, sign: int) -> dict:
+    """Achievement counter increments for completing (sign=1) or undoing (sign=-1) tasks"""
+    return {
+        "tasks_completed": sign * len(tasks),
+        "deep_work_completed": sign * sum(1 for task in tasks if task.get("is_deep_work")),
+    }
+
+async def _write_toggle(write: _BatchWrite, user_id: str) -> tuple:
+    """Apply a batch item that sets completed; returns (write with points, matched)"""
+    task_filter = {"_id": write.task["_id"], "user_id": user_id}
+    # As in update_task: only the request that actually flips the flag
+    # awards (or removes) the points, however many race on the task
+    completed = write.toggle
+    toggle_data = {**write.update, "completed_at": datetime.utcnow() if completed else None}
+    task = await tasks_collection.find_one_and_update(
+        {**task_filter, "completed": {"$ne": True} if completed else True},
+        {"$set": toggle_data},
+        return_document=ReturnDocument.BEFORE
+    )
+    
+    if task is None:
+        # Already in that state; the other fields still apply, without points
+        result = await tasks_collection.update_one(task_filter, {"$set": write.update})
+        return write, result.matched_count > 0
+    
+    points = calculate_task_points(task)
+    if completed:
+        completion = (toggle_data["completed_at"], 1)
+    else:
+        completion = (task.get("completed_at") or task.get("updated_at"), -1)
+    return write._replace(
+        points=points if completed else -points, completion=completion, task={**task, **toggle_data}
+    ), True
+
+@router.post("/batch", response_model=TaskBatchResponse)
+async def batch_tasks(
+    batch: TaskBatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Apply creates, updates, completions and deletes in one bulk write"""
+    user_id = current_user["id"]
+    now = datetime.utcnow()
+    results = []
+    operations = []
+    
+    # Load every referenced task in one query; malformed ids are reported as not found
+    object_ids = []
+    for task_id in [item.id for item in batch.updates] + batch.completions + batch.deletes:
+        try:
+            object_ids.append(ObjectId(task_id))
+        except (InvalidId, TypeError):
+            pass
+    
+    tasks = {}
+    if object_ids:
+        async for task in tasks_collection.find({
+            "_id": {"$in": object_ids},
+            "user_id": user_id
+        }):
+            tasks[str(task["_id"])] = task
+    
+    def add_result(op: str, index: int, task_id: Optional[str], error: Optional[str] = None):
+        results.append({
+            "op": op,
+            "index": index,
+            "id": task_id,
+            "status": "ok" if error is None else error,
+        })
+        return len(results) - 1
+    
+    for index, task_data in enumerate(batch.creates):
+        task_dict = task_data.dict()
+        task_dict.update({
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "completed": False,
+            "created_at": now,
+            "updated_at": now,
+        })
+        position = add_result("create", index, str(task_dict["_id"]))
+        operations.append(_BatchWrite(position, InsertOne(task_dict)))
+    
+    changes = (
+        [("update", index, item.id, item.dict(exclude_unset=True, exclude={"id"}))
+         for index, item in enumerate(batch.updates)]
+        + [("complete", index, task_id, {"completed": True})
+           for index, task_id in enumerate(batch.completions)]
+    )
+    for op, index, task_id, update_data in changes:
+        task = tasks.get(task_id)
+        if task is None:
+            add_result(op, index, task_id, "not_found")
+            continue
+        
+        update_data["updated_at"] = now
+        position = add_result(op, index, task_id)
+        operations.append(_BatchWrite(
+            position,
+            UpdateOne({"_id": task["_id"], "user_id": user_id}, {"$set": update_data}),
+            task=dict(task),
+            toggle=update_data.get("completed"),
+            update=update_data
+        ))
+        
+        # Later deletes in the batch see this item's changes
+        if update_data.get("completed") and not task.get("completed"):
+            task["completed_at"] = now
+        task.update(update_data)
+    
+    for index, task_id in enumerate(batch.deletes):
+        task = tasks.pop(task_id, None)
+        if task is None:
+            add_result("delete", index, task_id, "not_found")
+            continue
+        
+        completion = None
+        if task.get("completed"):
+            completion = (task.get("completed_at") or task.get("updated_at"), -1)
+        
+        position = add_result("delete", index, task_id)
+        operations.append(_BatchWrite(position, DeleteOne({"_id": task["_id"], "user_id": user_id}), completion=completion))
+    
+    # Runs of plain writes go out as one ordered bulk write, completion
+    # toggles one at a time in between; like an ordered bulk write, the
+    # first error stops the batch
+    applied = []
+    failed = None  # (write, errmsg)
+    for toggles, group in groupby(operations, key=lambda write: write.toggle is not None):
+        group = list(group)
+        if toggles:
+            for write in group:
+                try:
+                    write, matched = await _write_toggle(write, user_id)
+                except OperationFailure as e:
+                    failed = (write, str(e))
+                    break
+                if matched:
+                    applied.append(write)
+                else:
+                    results[write.position]["status"] = "not_found"
+        else:
+            try:
+                await tasks_collection.bulk_write([write.op for write in group], ordered=True)
+                applied.extend(group)
+            except BulkWriteError as e:
+                error = e.details["writeErrors"][0]
+                applied.extend(group[:error["index"]])
+                failed = (group[error["index"]], error.get("errmsg"))
+        if failed:
+            break
+    
+    if failed:
+        failed_write, message = failed
+        results[failed_write.position].update(status="error", error=message)
+        for write in operations:
+            if write.position > failed_write.position:
+                results[write.position]["status"] = "not_executed"
+    
+    # One user update for the points from every completion toggle that was written
+    points_delta = sum(write.points for write in applied)
+    completions = [write.completion for write in applied if write.completion]
+    if completions:
+        await enqueue(record_task_completions, user_id, completions)
+    
+    completed_any = any(delta > 0 for _, delta in completions)
+    user = None
+    if points_delta or completed_any:
+        # Also bumps the data version
+        user = await apply_progress(user_id, points_delta, completed_any)
+        if user:
+            await cache_user(user)
+    elif applied:
+        await bump_data_version(user_id)
+    
+    if applied:
+        await stream_hub.publish(TASKS, {"ids": [results[write.position]["id"] for write in applied]}, user_id)
+    
+    completed_tasks = [write.task for write in applied if write.points > 0]
+    uncompleted_tasks = [write.task for write in applied if write.points < 0]
+    if completed_tasks:
+        await events.publish(
+            events.TASK_COMPLETED, user_id,
+            counters=_completion_counters(completed_tasks, 1),
+            gauges={"current_streak": (user or {}).get("current_streak", 0)}
+        )
+    if uncompleted_tasks:
+        await events.publish(
+            events.TASK_UNCOMPLETED, user_id,
+            counters=_completion_counters(uncompleted_tasks, -1)
+        )
+    
+    return {"results": results, "points_delta": points_delta}
+
 @router.get("/", response_model=List[TaskResponse])
 async def get_tasks(
+    request: Request,
+    response: Response,
     completed: Optional[bool] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
+    version, modified_at = await get_data_version(current_user["id"])
+    not_modified = check_conditional(
+        request, response, weak_etag("tasks", current_user["id"], version, request.url.query), modified_at
+    )
+    if not_modified is not None:
+        return not_modified
+    
     query = {"user_id": current_user["id"]}
     if completed is not None:
         query["completed"] = completed
     
-    tasks = []
-    async for task in tasks_collection.find(query).sort("created_at", -1):
-        task["id"] = str(task["_id"])
-        task.pop("_id", None)
-        tasks.append(task)
+    field_list = parse_fields(fields, TaskResponse)
+    tasks, next_cursor = await fetch_page(
+        secondary_reads(tasks_collection, modified_at), TaskResponse, query, "created_at", limit, cursor, field_list
+    )
     
-    return tasks
+    return page_response(response, tasks, next_cursor, partial=field_list is not None)
 
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
@@ -80,14 +308,11 @@ async def get_task(
     task = await tasks_collection.find_one({
         "_id": ObjectId(task_id),
         "user_id": current_user["id"]
-    })
+    }, model_projection(TaskResponse))
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task["id"] = str(task["_id"])
-    task.pop("_id", None)
-    
     return task
 
 @router.put("/{task_id}", response_model=TaskResponse)
@@ -96,43 +321,65 @@ async def update_task(
     task_update: TaskUpdate,
     current_user: dict = Depends(get_current_user)
 ):
-    task = await tasks_collection.find_one({
+    task_filter = {
         "_id": ObjectId(task_id),
         "user_id": current_user["id"]
-    })
-    
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    }
     
     update_data = task_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
     
-    # If marking complete, add points based on priority and other factors
-    if "completed" in update_data and update_data["completed"] and not task.get("completed"):
-        points = calculate_task_points(task)
-        await users_collection.update_one(
-            {"_id": ObjectId(current_user["id"])},
-            {"$inc": {"total_points": points}}
-        )
-        update_data["completed_at"] = datetime.utcnow()
-    
-    # If marking incomplete, remove points
-    elif "completed" in update_data and not update_data["completed"] and task.get("completed"):
-        points = calculate_task_points(task)
-        await users_collection.update_one(
-            {"_id": ObjectId(current_user["id"])},
-            {"$inc": {"total_points": -points}}
+    updated_task = None
+    completed = update_data.get("completed")
+    if completed is not None:
+        # Only flip the flag if it isn't already set, so exactly one request
+        # awards (or removes) the points even when updates race
+        toggle_data = dict(update_data)
+        toggle_data["completed_at"] = datetime.utcnow() if completed else None
+        
+        task = await tasks_collection.find_one_and_update(
+            {**task_filter, "completed": {"$ne": True} if completed else True},
+            {"$set": toggle_data},
+            return_document=ReturnDocument.BEFORE
         )
-        update_data["completed_at"] = None
+        
+        if task:
+            # Points come from the task as it was before this update, as they always have
+            points = calculate_task_points(task)
+            user = await apply_progress(current_user["id"], points if completed else -points, completed)
+            if user:
+                await cache_user(user)
+            
+            await events.publish(
+                events.TASK_COMPLETED if completed else events.TASK_UNCOMPLETED,
+                current_user["id"],
+                counters=_completion_counters([task], 1 if completed else -1),
+                gauges={"current_streak": (user or {}).get("current_streak", 0)}
+            )
+            
+            if completed:
+                await enqueue(record_task_completions, current_user["id"], [(toggle_data["completed_at"], 1)])
+            else:
+                await enqueue(
+                    record_task_completions,
+                    current_user["id"], [(task.get("completed_at") or task.get("updated_at"), -1)]
+                )
+            
+            updated_task = {**task, **toggle_data}
     
-    await tasks_collection.update_one(
-        {"_id": ObjectId(task_id)},
-        {"$set": update_data}
-    )
+    if updated_task is None:
+        updated_task = await tasks_collection.find_one_and_update(
+            task_filter,
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if not updated_task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        await bump_data_version(current_user["id"])
     
-    updated_task = await tasks_collection.find_one({"_id": ObjectId(task_id)})
-    updated_task["id"] = str(updated_task["_id"])
-    updated_task.pop("_id", None)
+    to_api(updated_task)
+    await stream_hub.publish(TASK, {"action": "updated", "task": updated_task}, current_user["id"])
     
     return updated_task
 
@@ -141,12 +388,21 @@ async def delete_task(
     task_id: str,
     current_user: dict = Depends(get_current_user)
 ):
-    result = await tasks_collection.delete_one({
+    task = await tasks_collection.find_one_and_delete({
         "_id": ObjectId(task_id),
         "user_id": current_user["id"]
     })
     
-    if result.deleted_count == 0:
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    await bump_data_version(current_user["id"])
+    await stream_hub.publish(TASK, {"action": "deleted", "task": {"id": task_id}}, current_user["id"])
+    
+    # Deleted completions drop out of the daily rollups, as they do from raw counts
+    if task.get("completed"):
+        await enqueue(
+            record_task_completions,
+            current_user["id"], [(task.get("completed_at") or task.get("updated_at"), -1)]
+        )
     
     return None
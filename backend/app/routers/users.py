@@ -1,14 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from datetime import datetime
+import json
 from ..database import users_collection
 from ..schemas import UserResponse, UserUpdate
-from ..auth import get_current_user
+from ..auth import get_current_user, cache_user
+from ..documents import USER_PROJECTION, model_projection, to_api
+from ..versions import remember_data_version
+from ..conditional import check_conditional, weak_etag
+from ..stats import day_start
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_current_user_profile(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    # The user is already in memory, so its content is the validator; the
+    # streak can lapse at midnight without a write
+    etag = weak_etag(json.dumps(current_user, default=str, sort_keys=True))
+    today = day_start(datetime.utcnow())
+    last_modified = max(current_user.get("data_modified_at") or today, today)
+    
+    not_modified = check_conditional(request, response, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
     return current_user
 
 @router.put("/me", response_model=UserResponse)
@@ -19,15 +38,15 @@ async def update_profile(
     update_data = user_update.dict(exclude_unset=True)
     
     if update_data:
-        await users_collection.update_one(
+        updated_user = await users_collection.find_one_and_update(
             {"_id": ObjectId(current_user["id"])},
-            {"$set": update_data}
+            {"$set": {**update_data, "data_modified_at": datetime.utcnow()}, "$inc": {"data_version": 1}},
+            projection=USER_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
-        
-        updated_user = await users_collection.find_one({"_id": ObjectId(current_user["id"])})
-        updated_user["id"] = str(updated_user["_id"])
-        updated_user.pop("_id", None)
-        updated_user.pop("hashed_password", None)
+        to_api(updated_user)
+        await cache_user(updated_user)
+        await remember_data_version(updated_user)
         
         return updated_user
     
@@ -35,13 +54,9 @@ async def update_profile(
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user_by_id(user_id: str):
-    user = await users_collection.find_one({"_id": ObjectId(user_id)})
+    user = await users_collection.find_one({"_id": ObjectId(user_id)}, model_projection(UserResponse))
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user["id"] = str(user["_id"])
-    user.pop("_id", None)
-    user.pop("hashed_password", None)
-    
     return user
@@ -74,6 +74,26 @@ class TaskResponse(TaskBase):
     class Config:
         from_attributes = True
 
+class TaskBatchUpdate(TaskUpdate):
+    id: str
+
+class TaskBatchRequest(BaseModel):
+    creates: List[TaskCreate] = []
+    updates: List[TaskBatchUpdate] = []
+    deletes: List[str] = []
+    completions: List[str] = []
+
+class TaskBatchItemResult(BaseModel):
+    op: str
+    index: int
+    id: Optional[str] = None
+    status: str = "ok"
+    error: Optional[str] = None
+
+class TaskBatchResponse(BaseModel):
+    results: List[TaskBatchItemResult]
+    points_delta: int = 0
+
 # Mood Log Schemas
 class MoodLogBase(BaseModel):
     mood_score: int = Field(ge=1, le=10)
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from .jobs import background_job, current_job_id
+from .versions import bump_data_version
+from .indexes import meta_collection
+from .database import (
+    user_daily_stats_collection, tasks_collection,
+    mood_logs_collection, sleep_logs_collection, users_collection
+)
+
+# Per-user daily rollups. One small document per (user_id, day) holds the
+# counts, sums and min/max analytics need, kept current by the write paths
+# so reads cost O(days) instead of O(logs).
+
+MOOD_FIELDS = ["mood_score", "focus_level", "energy_level", "stress_level"]
+SLEEP_FIELDS = ["hours_slept", "sleep_debt"]
+
+# Fields the rebuild recomputes; practice_minutes has no raw history to rebuild from
+REBUILT_FIELDS = (
+    ["tasks_completed", "mood_count", "sleep_count"]
+    + [f"{field}_sum" for field in MOOD_FIELDS + SLEEP_FIELDS]
+    + ["mood_score_min", "mood_score_max", "hours_slept_min", "hours_slept_max"]
+)
+
+def day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+# Bump ROLLUP_VERSION whenever the rollup fields or how they are derived
+# change. A full rebuild records it in schema_meta, like INDEX_VERSION for
+# indexes; with REBUILD_ROLLUPS_ON_STARTUP the first worker on a new
+# version runs that rebuild itself.
+ROLLUP_VERSION = 1
+ROLLUP_REBUILD_LEASE = timedelta(hours=1)
+
+# Op ids of the jobs applied to a rollup document; a retried job finds its
+# id here and doesn't add its increments twice. Retries come within
+# seconds, so only the most recent ids are kept.
+APPLIED_OPS_KEPT = 200
+
+def _rollup_update(user_id: str, when: datetime, inc: dict, low: Optional[dict] = None, high: Optional[dict] = None):
+    update = {"$inc": inc}
+    if low:
+        update["$min"] = low
+    if high:
+        update["$max"] = high
+    
+    query = {"user_id": user_id, "day": day_start(when)}
+    op_id = current_job_id()
+    if op_id is not None:
+        query["applied_ops"] = {"$ne": op_id}
+        update["$push"] = {"applied_ops": {"$each": [op_id], "$slice": -APPLIED_OPS_KEPT}}
+    return UpdateOne(query, update, upsert=True)
+
+def _duplicate_key_errors(error: BulkWriteError) -> list:
+    return [e["index"] for e in error.details["writeErrors"] if e["code"] == 11000]
+
+async def _apply(user_id: str, ops: list):
+    try:
+        await user_daily_stats_collection.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # A duplicate key means the op id filter missed an existing day,
+        # i.e. this job already applied it, or that a concurrent upsert
+        # created the day first. Running those ops again settles which:
+        # they apply now in the second case and fail the same way in the first.
+        retry = [ops[index] for index in _duplicate_key_errors(e)]
+        if len(retry) < len(e.details["writeErrors"]):
+            raise
+        try:
+            await user_daily_stats_collection.bulk_write(retry, ordered=False)
+        except BulkWriteError as again:
+            if len(_duplicate_key_errors(again)) < len(again.details["writeErrors"]):
+                raise
+    
+    # The dashboard reads these rollups, so its ETag has to change with them.
+    # If this fails the job is retried, and the op ids above keep the
+    # rollups from being counted twice.
+    await bump_data_version(user_id)
+
+@background_job
+async def record_mood(user_id: str, log: dict):
+    inc = {"mood_count": 1}
+    for field in MOOD_FIELDS:
+        inc[f"{field}_sum"] = log.get(field, 0)
+    
+    op = _rollup_update(
+        user_id, log["created_at"], inc,
+        low={"mood_score_min": log.get("mood_score", 0)},
+        high={"mood_score_max": log.get("mood_score", 0)}
+    )
+    await _apply(user_id, [op])
+
+@background_job
+async def record_sleep(user_id: str, log: dict):
+    inc = {"sleep_count": 1}
+    for field in SLEEP_FIELDS:
+        inc[f"{field}_sum"] = log.get(field, 0)
+    
+    op = _rollup_update(
+        user_id, log["created_at"], inc,
+        low={"hours_slept_min": log.get("hours_slept", 0)},
+        high={"hours_slept_max": log.get("hours_slept", 0)}
+    )
+    await _apply(user_id, [op])
+
+@background_job
+async def record_task_completions(user_id: str, changes: list):
+    """Apply (completed_at, +1/-1) pairs; completions count on the day they happened"""
+    per_day = defaultdict(int)
+    for when, delta in changes:
+        per_day[day_start(when)] += delta
+    
+    ops = [
+        _rollup_update(user_id, day, {"tasks_completed": delta})
+        for day, delta in per_day.items() if delta
+    ]
+    if ops:
+        await _apply(user_id, ops)
+
+@background_job
+async def record_practice(user_id: str, minutes: int, when: datetime):
+    await _apply(user_id, [_rollup_update(user_id, when, {"practice_minutes": minutes})])
+
+async def get_daily_stats(
+    user_id: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    collection=user_daily_stats_collection
+) -> list:
+    query = {"user_id": user_id, "day": {"$gte": day_start(start)}}
+    if end is not None:
+        query["day"]["$lt"] = end
+    
+    rows = []
+    async for row in collection.find(query, {"_id": 0, "applied_ops": 0}).sort("day", 1):
+        rows.append(row)
+    return rows
+
+# Rebuild
+
+def _raw_pipeline(date_field, match: dict, group: dict) -> list:
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "day": {"$dateTrunc": {"date": date_field, "unit": "day"}}},
+            **group
+        }}
+    ]
+
+async def compute_rollups(user_id: Optional[str] = None) -> dict:
+    """Recompute the rebuildable rollup fields from raw tasks, mood and sleep logs"""
+    base = {"user_id": user_id} if user_id else {}
+    rollups = defaultdict(lambda: {field: 0 for field in REBUILT_FIELDS})
+    
+    sources = [
+        (tasks_collection, _raw_pipeline(
+            {"$ifNull": ["$completed_at", "$updated_at"]},
+            {**base, "completed": True},
+            {"tasks_completed": {"$sum": 1}}
+        )),
+        (mood_logs_collection, _raw_pipeline("$created_at", base, {
+            "mood_count": {"$sum": 1},
+            **{f"{field}_sum": {"$sum": {"$ifNull": [f"${field}", 0]}} for field in MOOD_FIELDS},
+            "mood_score_min": {"$min": {"$ifNull": ["$mood_score", 0]}},
+            "mood_score_max": {"$max": {"$ifNull": ["$mood_score", 0]}},
+        })),
+        (sleep_logs_collection, _raw_pipeline("$created_at", base, {
+            "sleep_count": {"$sum": 1},
+            **{f"{field}_sum": {"$sum": {"$ifNull": [f"${field}", 0]}} for field in SLEEP_FIELDS},
+            "hours_slept_min": {"$min": {"$ifNull": ["$hours_slept", 0]}},
+            "hours_slept_max": {"$max": {"$ifNull": ["$hours_slept", 0]}},
+        })),
+    ]
+    
+    for collection, pipeline in sources:
+        async for row in collection.aggregate(pipeline, allowDiskUse=True):
+            key = (row["_id"]["user_id"], row["_id"]["day"])
+            for field, value in row.items():
+                if field != "_id":
+                    rollups[key][field] = value
+    
+    return rollups
+
+async def rebuild_rollups(user_id: Optional[str] = None, check: bool = False) -> list:
+    """Rebuild rollups from raw data; with check=True only report mismatches"""
+    expected = await compute_rollups(user_id)
+    
+    mismatches = []
+    stored_keys = set()
+    async for row in user_daily_stats_collection.find({"user_id": user_id} if user_id else {}):
+        key = (row["user_id"], row["day"])
+        stored_keys.add(key)
+        wanted = expected.get(key, {field: 0 for field in REBUILT_FIELDS})
+        diff = {
+            field: (row.get(field, 0), value)
+            for field, value in wanted.items()
+            if abs((row.get(field) or 0) - value) > 1e-6
+        }
+        if diff:
+            mismatches.append({"user_id": key[0], "day": key[1], "fields": diff})
+    
+    for key in expected.keys() - stored_keys:
+        mismatches.append({"user_id": key[0], "day": key[1], "fields": {"missing": True}})
+    
+    if not check:
+        ops = []
+        for key in stored_keys | expected.keys():
+            values = expected.get(key, {field: 0 for field in REBUILT_FIELDS})
+            ops.append(UpdateOne({"user_id": key[0], "day": key[1]}, {"$set": values}, upsert=True))
+            if len(ops) >= 1000:
+                await user_daily_stats_collection.bulk_write(ops, ordered=False)
+                ops = []
+        if ops:
+            await user_daily_stats_collection.bulk_write(ops, ordered=False)
+        
+        # Analytics ETags derive from the data version, so corrected users
+        # must not keep revalidating cached (wrong) dashboards
+        user_ids = sorted({mismatch["user_id"] for mismatch in mismatches})
+        for start in range(0, len(user_ids), 1000):
+            await users_collection.update_many(
+                {"_id": {"$in": [ObjectId(uid) for uid in user_ids[start:start + 1000]]}},
+                {"$inc": {"data_version": 1}, "$set": {"data_modified_at": datetime.utcnow()}}
+            )
+        
+        if user_id is None:
+            await meta_collection.update_one(
+                {"_id": "rollups"},
+                {"$set": {"version": ROLLUP_VERSION, "applied_at": datetime.utcnow()}, "$unset": {"locked_until": ""}},
+                upsert=True
+            )
+    
+    return mismatches
+
+async def get_rollup_version() -> int:
+    meta = await meta_collection.find_one({"_id": "rollups"})
+    return (meta or {}).get("version", 0)
+
+async def ensure_rollups() -> bool:
+    """Rebuild every rollup once per ROLLUP_VERSION; returns True if this worker ran the rebuild"""
+    now = datetime.utcnow()
+    try:
+        # Take the rebuild lease; with several workers only one gets it
+        await meta_collection.update_one(
+            {
+                "_id": "rollups",
+                "version": {"$not": {"$gte": ROLLUP_VERSION}},
+                "$or": [{"locked_until": {"$exists": False}}, {"locked_until": {"$lt": now}}],
+            },
+            {"$set": {"locked_until": now + ROLLUP_REBUILD_LEASE}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The document exists but didn't match: already current, or another worker is on it
+        return False
+    
+    print(f"Rebuilding daily rollups for version {ROLLUP_VERSION}")
+    try:
+        mismatches = await rebuild_rollups()
+    except Exception as e:
+        # The lease runs out and the next start tries again
+        print(f"Rollup rebuild failed: {e}")
+        return False
+    print(f"Rebuilt daily rollups ({len(mismatches)} documents corrected)")
+    return True
+
+async def _main(command: str, user_id: Optional[str]) -> int:
+    mismatches = await rebuild_rollups(user_id, check=command == "check")
+    for mismatch in mismatches[:50]:
+        print(f"{mismatch['user_id']} {mismatch['day']:%Y-%m-%d}: {mismatch['fields']}")
+    
+    if command == "check":
+        print(f"{len(mismatches)} rollup documents differ from raw data")
+        return 1 if mismatches else 0
+    
+    print(f"Rebuilt rollups ({len(mismatches)} documents corrected)")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or verify user_daily_stats rollups")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", default=None)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.command, args.user_id)))
@@ -0,0 +1,214 @@
+import asyncio
+import itertools
+import json
+from collections import defaultdict
+from contextlib import suppress
+from datetime import date, datetime
+from typing import Optional
+from bson import ObjectId
+from .config import settings
+from .database import stream_events_collection
+
+# Live updates pushed to clients over Server-Sent Events. Writes publish a
+# small event for the user they belong to (user_id None reaches everyone);
+# every open stream is a bounded queue on the worker holding it.
+#
+# Backends: "memory" fans out within this worker only, which is all a single
+# worker needs. "mongo" inserts each event into stream_events and every
+# worker fans out what its change stream delivers, so a write handled by one
+# worker reaches the streams held by the others. Change streams need a
+# replica set (Atlas always is one).
+
+TASK = "task"  # {"action": "created" | "updated" | "deleted", "task": {...}}; deleted tasks carry only the id
+TASKS = "tasks"  # {"ids": [...]} after a batch; refetch the list
+PROGRESS = "progress"  # total_points, level and streaks after a change
+MOOD = "mood"  # {"log": {...}}
+SLEEP = "sleep"  # {"log": {...}}
+CAMPUS_EVENT = "campus_event"  # {"action": "created" | "deleted", "event" | "id": ...}
+RESYNC = "resync"  # Events were dropped; refetch whatever is on screen
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def format_event(event_id: str, event: str, data: dict) -> str:
+    """One SSE message; encoded once however many streams it goes to"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=_default, separators=(',', ':'))}\n\n"
+
+class Subscription:
+    def __init__(self, hub: "StreamHub", user_id: str, max_size: int):
+        self.hub = hub
+        self.user_id = user_id
+        self.queue = asyncio.Queue(max_size)
+    
+    def deliver(self, message: Optional[str]):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Backpressure: a client that can't keep up loses its backlog and
+            # is told to refetch, rather than holding unbounded memory here
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(message if message is None else self.hub.resync_message())
+            self.hub.resyncs += 1
+    
+    def close(self):
+        self.deliver(None)
+
+class StreamHub:
+    def __init__(self, backend: str = "memory", queue_size: int = 100, max_connections_per_user: int = 5):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.max_connections_per_user = max_connections_per_user
+        
+        self._subscribers = defaultdict(set)
+        self._ids = itertools.count(1)
+        self._watcher = None
+        self._running = False
+        
+        self.published = 0
+        self.resyncs = 0
+    
+    def connections(self, user_id: Optional[str] = None) -> int:
+        if user_id is not None:
+            return len(self._subscribers.get(user_id, ()))
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+    
+    def subscribe(self, user_id: str) -> Optional[Subscription]:
+        """A new subscription, or None when the user already has the maximum open on this worker"""
+        if self.connections(user_id) >= self.max_connections_per_user:
+            return None
+        subscription = Subscription(self, user_id, self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+    
+    def resync_message(self) -> str:
+        return format_event(f"r{next(self._ids)}", RESYNC, {})
+    
+    async def publish(self, event: str, data: dict, user_id: Optional[str] = None):
+        """Push an event to a user's streams, or to every stream when user_id is None"""
+        self.published += 1
+        if self.backend != "mongo":
+            self._fan_out(str(next(self._ids)), user_id, event, data)
+            return
+        
+        try:
+            await stream_events_collection.insert_one({
+                "user_id": user_id,
+                "event": event,
+                "data": data,
+                "created_at": datetime.utcnow()
+            })
+        except Exception as e:
+            # A lost notification must not fail the write that raised it
+            print(f"Stream publish failed: {e}")
+    
+    def _fan_out(self, event_id: str, user_id: Optional[str], event: str, data: dict):
+        if user_id is None:
+            subscriptions = [s for group in self._subscribers.values() for s in group]
+        else:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        if not subscriptions:
+            return
+        
+        message = format_event(event_id, event, data)
+        for subscription in subscriptions:
+            subscription.deliver(message)
+    
+    def _resync_all(self):
+        message = self.resync_message()
+        for group in self._subscribers.values():
+            for subscription in group:
+                subscription.deliver(message)
+    
+    async def _watch(self):
+        resume_after = None
+        while self._running:
+            try:
+                async with stream_events_collection.watch(
+                    [{"$match": {"operationType": "insert"}}], resume_after=resume_after
+                ) as changes:
+                    async for change in changes:
+                        resume_after = changes.resume_token
+                        doc = change["fullDocument"]
+                        self._fan_out(str(doc["_id"]), doc.get("user_id"), doc["event"], doc["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stream change feed failed, reconnecting: {e}")
+                # Whatever was published meanwhile is gone, so start over
+                # from now and have every client refetch
+                resume_after = None
+                self._resync_all()
+                await asyncio.sleep(1)
+    
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        if self.backend == "mongo":
+            self._watcher = asyncio.create_task(self._watch())
+    
+    async def stop(self):
+        """End every open stream, so shutdown doesn't wait on them"""
+        self._running = False
+        if self._watcher is not None:
+            self._watcher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._watcher
+            self._watcher = None
+        
+        for group in list(self._subscribers.values()):
+            for subscription in list(group):
+                subscription.close()
+    
+    async def messages(self, user_id: str, resync: bool = False):
+        """SSE body for one client: events as they arrive, with keepalive comments in between"""
+        subscription = self.subscribe(user_id)
+        if subscription is None:
+            # Lost a race for the user's last slot; the client retries later
+            return
+        
+        try:
+            yield f"retry: {settings.STREAM_RETRY_MILLISECONDS}\n\n"
+            if resync:
+                # Reconnecting clients missed whatever happened in between
+                yield self.resync_message()
+            
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream and finds dead clients
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+    
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "connections": self.connections(),
+            "users": len(self._subscribers),
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+stream_hub = StreamHub(
+    backend=settings.STREAM_BACKEND,
+    queue_size=settings.STREAM_QUEUE_SIZE,
+    max_connections_per_user=settings.STREAM_MAX_CONNECTIONS_PER_USER,
+)
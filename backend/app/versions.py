@@ -0,0 +1,48 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from .cache import InMemoryLRUCache
+from .config import settings
+from .database import secondary_reads, users_collection
+
+# Per-user data version. Every write to a user's tasks, logs, skills,
+# profile, points or rollups bumps data_version and data_modified_at on the
+# user document; the user's read endpoints derive their ETag and
+# Last-Modified from it. Versions are cached briefly, so a conditional
+# request is answered with one small read at most.
+_versions = InMemoryLRUCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.DATA_VERSION_CACHE_TTL_SECONDS
+)
+
+async def remember_data_version(user: dict):
+    """Cache the version of a user document that was just loaded or written"""
+    await _versions.set(user["id"], (user.get("data_version", 0), user.get("data_modified_at")))
+
+async def bump_data_version(user_id: str):
+    user = await users_collection.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {"$inc": {"data_version": 1}, "$set": {"data_modified_at": datetime.utcnow()}},
+        projection={"data_version": 1, "data_modified_at": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if user:
+        await _versions.set(user_id, (user["data_version"], user["data_modified_at"]))
+
+async def get_data_version(user_id: str) -> tuple:
+    """(data_version, data_modified_at) for the user; data_modified_at may be None"""
+    version = await _versions.get(user_id)
+    if version is None:
+        user = await users_collection.find_one(
+            {"_id": ObjectId(user_id)}, {"data_version": 1, "data_modified_at": 1}
+        ) or {}
+        version = (user.get("data_version", 0), user.get("data_modified_at"))
+        await _versions.set(user_id, version)
+    return version
+
+async def user_reads(collection, user_id: str):
+    """`collection` for reading the user's data: a secondary once their last write is old enough"""
+    if not settings.MONGO_SECONDARY_READS:
+        return collection
+    _, modified_at = await get_data_version(user_id)
+    return secondary_reads(collection, modified_at)
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from .config import settings
+from .database import database
+from .indexes import INDEX_VERSION, ensure_indexes, get_applied_version
+from .achievements import get_achievement_catalog
+from .campus_feed import get_campus_feed
+from .stats import ROLLUP_VERSION, get_rollup_version
+from .routers.auth import oauth
+
+# Startup warmup, run by the lifespan before a worker takes traffic: open
+# Mongo connections, bring the indexes up to date and load the caches the
+# first requests would otherwise fill. /ready reports the outcome; /health
+# only says the process is up. Only the database step is required, the
+# rest make the first requests fast but the API works without them.
+
+_status = {
+    "ready": False,
+    "warmup_seconds": None,
+    "steps": {},
+}
+
+async def _open_connections():
+    # Concurrent pings each need a connection of their own, so the pool is
+    # already this big when the first requests arrive
+    await asyncio.gather(*(database.command("ping") for _ in range(max(1, settings.WARMUP_CONNECTIONS))))
+    return {"connections": max(1, settings.WARMUP_CONNECTIONS)}
+
+async def _indexes():
+    applied = False
+    if settings.ENSURE_INDEXES_ON_STARTUP:
+        applied = await ensure_indexes()
+    version = await get_applied_version()
+    if version < INDEX_VERSION:
+        print(f"Indexes are at version {version}, the code expects {INDEX_VERSION}")
+    return {"applied": applied, "version": version, "current": version >= INDEX_VERSION}
+
+async def _rollups():
+    version = await get_rollup_version()
+    if version < ROLLUP_VERSION:
+        print(f"Rollups are at version {version}, the code expects {ROLLUP_VERSION}; run python -m app.stats rebuild")
+    return {"version": version, "current": version >= ROLLUP_VERSION}
+
+async def _achievement_catalog():
+    return {"achievements": len(await get_achievement_catalog())}
+
+async def _campus_feed():
+    feed = await get_campus_feed()
+    return {"events": len(feed.buckets[None].events)}
+
+async def _oauth_metadata():
+    # Fetch the providers' discovery documents now rather than on the first login
+    loaded = []
+    for name in ("google", "github"):
+        client = oauth.create_client(name)
+        if client is not None and client.server_metadata_url:
+            await client.load_server_metadata()
+            loaded.append(name)
+    return {"providers": loaded}
+
+# (name, step, required). Without WARMUP_ON_STARTUP only the database step
+# runs, plus the index build when ENSURE_INDEXES_ON_STARTUP asks for it
+STEPS = [
+    ("database", _open_connections, True),
+    ("indexes", _indexes, False),
+    ("rollups", _rollups, False),
+    ("achievement_catalog", _achievement_catalog, False),
+    ("campus_feed", _campus_feed, False),
+    ("oauth_metadata", _oauth_metadata, False),
+]
+
+async def _run_step(name: str, step) -> dict:
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(step(), settings.WARMUP_STEP_TIMEOUT_SECONDS)
+        result["ok"] = True
+    except Exception as e:
+        print(f"Warmup step {name} failed: {e!r}")
+        result = {"ok": False, "error": repr(e)}
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+async def warm_up():
+    """Run every warmup step (each failure is logged, not raised) and record readiness"""
+    start = time.perf_counter()
+    for name, step, _ in STEPS:
+        if (
+            name == "database"
+            or (name == "indexes" and settings.ENSURE_INDEXES_ON_STARTUP)
+            or settings.WARMUP_ON_STARTUP
+        ):
+            _status["steps"][name] = await _run_step(name, step)
+    
+    _status["ready"] = all(
+        _status["steps"].get(name, {}).get("ok", True) for name, _, required in STEPS if required
+    )
+    _status["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Warmup finished in {_status['warmup_seconds']}s, ready={_status['ready']}")
+
+async def readiness() -> dict:
+    """Warmup results; a worker that started without Mongo becomes ready once a ping succeeds"""
+    if not _status["ready"]:
+        _status["steps"]["database"] = await _run_step("database", _open_connections)
+        _status["ready"] = _status["steps"]["database"]["ok"]
+    return _status
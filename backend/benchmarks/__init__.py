@@ -0,0 +1 @@
+# PlanWise Benchmarks
@@ -0,0 +1,69 @@
+# Auth dependency microbenchmark
+#
+# Times the pieces of get_current_user in isolation: raw decode with
+# python-jose and (if installed) PyJWT, verify_token with a cold and a warm
+# token cache, and the whole dependency on a warm cache. Only the cold
+# verify_token runs touch Mongo (the revocation lookup); it is read-only.
+#
+#   python -m benchmarks.auth_dependency --iterations 20000
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from jose import jwt
+from starlette.requests import Request
+
+from app.auth import cache_user, create_access_token, get_current_user, token_cache, verify_token
+from app.config import settings
+
+try:
+    import jwt as pyjwt
+except ImportError:
+    pyjwt = None
+
+async def timed(name: str, iterations: int, func):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:34} {elapsed / iterations * 1_000_000:8.1f} us/call")
+
+async def main(iterations: int):
+    user_id = str(ObjectId())
+    await cache_user({"id": user_id, "username": "auth_bench", "total_points": 0, "created_at": datetime.utcnow()})
+    token = create_access_token({"sub": user_id}, timedelta(days=30))
+    
+    async def decode_jose():
+        jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    
+    async def decode_pyjwt():
+        pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    
+    async def verify_cold():
+        await token_cache.clear()
+        await verify_token(token)
+    
+    async def verify_warm():
+        await verify_token(token)
+    
+    async def dependency_warm():
+        request = Request({"type": "http", "method": "GET", "path": "/", "headers": []})
+        await get_current_user(request, token)
+    
+    print(f"JWT_BACKEND={settings.JWT_BACKEND}, {iterations} iterations")
+    await timed("decode (python-jose)", iterations, decode_jose)
+    if pyjwt is not None:
+        await timed("decode (PyJWT)", iterations, decode_pyjwt)
+    await timed("verify_token, cold cache", iterations, verify_cold)
+    await verify_token(token)
+    await timed("verify_token, warm cache", iterations, verify_warm)
+    await timed("get_current_user, warm caches", iterations, dependency_warm)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the auth dependency in isolation")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
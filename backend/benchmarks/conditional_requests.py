@@ -0,0 +1,75 @@
+# Conditional request check
+#
+# For each endpoint with an ETag, counts the Mongo commands of a full GET, a
+# revalidation that gets 304 with the data version cached and without it, and
+# checks that a write makes the next revalidation return 200 again. The job
+# queue isn't started, so rollup jobs run inline and the numbers are stable.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.conditional_requests
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import users_collection, track_commands
+from app.main import app
+from app.versions import _versions
+
+MOOD = {"mood_score": 7, "focus_level": 6, "energy_level": 5, "stress_level": 4}
+
+# (endpoint, write that should change it)
+ENDPOINTS = [
+    ("/api/users/me", "PUT", "/api/users/me", {"bio": "Changed"}),
+    ("/api/tasks/", "POST", "/api/tasks/", {"title": "Changes the list"}),
+    ("/api/mood/latest", "POST", "/api/mood/", MOOD),
+    ("/api/analytics/dashboard", "POST", "/api/mood/", MOOD),
+]
+
+async def main() -> int:
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to write to the default database; set DB_NAME to a scratch database")
+    
+    result = await users_collection.insert_one({
+        "email": f"etag_{datetime.utcnow().timestamp()}@example.com",
+        "username": f"etag_{datetime.utcnow().timestamp()}",
+        "hashed_password": "",
+        "total_points": 0,
+        "daily_sleep_goal": 8.0,
+        "created_at": datetime.utcnow(),
+    })
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(result.inserted_id)}, timedelta(minutes=5))}"}
+    
+    failures = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.post("/api/mood/", json=MOOD, headers=headers)
+        await client.post("/api/tasks/", json={"title": "ETag task"}, headers=headers)
+        
+        print(f"{'endpoint':28} {'full':>5} {'304':>5} {'304 uncached':>13}  after write")
+        for path, method, write_path, body in ENDPOINTS:
+            with track_commands() as full:
+                response = await client.get(path, headers=headers)
+            etag = response.headers.get("etag")
+            conditional = {**headers, "If-None-Match": etag or ""}
+            
+            with track_commands() as cached:
+                hit = await client.get(path, headers=conditional)
+            await _versions.clear()
+            with track_commands() as uncached:
+                miss = await client.get(path, headers=conditional)
+            
+            await client.request(method, write_path, json=body, headers=headers)
+            changed = await client.get(path, headers=conditional)
+            
+            ok = hit.status_code == 304 and miss.status_code == 304 and changed.status_code == 200
+            failures += not ok
+            print(f"{path:28} {full.count:5} {cached.count:5} {uncached.count:13}  {changed.status_code}"
+                  f"{'' if ok else '  FAIL'}")
+    
+    await users_collection.delete_one({"_id": result.inserted_id})
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
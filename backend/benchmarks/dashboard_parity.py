@@ -0,0 +1,224 @@
+# Dashboard parity check
+#
+# Seeds tasks, mood logs, sleep logs and skills for a few scratch users,
+# spread over a window wider than the dashboard period, and compares
+# build_dashboard (counts, daily rollups and a skills $group) with the
+# per-document Python code the endpoint used to run. Two differences are
+# intended: the period starts at midnight of its first day, and completions
+# are counted by completed_at (updated_at for tasks completed before it
+# existed). So every field outside the period must match the baseline
+# exactly, and the period fields must match the baseline code run with
+# those two changes. Some documents lack numeric fields, which both sides
+# count as 0.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.dashboard_parity --users 5 --docs 200
+
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.config import settings
+from app.database import (
+    users_collection, tasks_collection, mood_logs_collection,
+    sleep_logs_collection, user_skills_collection, user_daily_stats_collection
+)
+from app.documents import to_api
+from app.routers.analytics import build_dashboard
+from app.stats import day_start, rebuild_rollups
+
+def _maybe(rng: random.Random, value):
+    # Roughly one document in ten is missing the field
+    return value if rng.random() > 0.1 else None
+
+def _document(fields: dict) -> dict:
+    return {name: value for name, value in fields.items() if value is not None}
+
+async def seed_user(rng: random.Random, docs: int, days: int) -> dict:
+    now = datetime.utcnow()
+    user = {
+        "email": f"parity_{now.timestamp()}_{rng.random()}@example.com",
+        "username": f"parity_{now.timestamp()}_{rng.random()}",
+        "hashed_password": "",
+        "total_points": rng.randint(0, 500),
+        "current_streak": rng.randint(0, 10),
+        "longest_streak": rng.randint(10, 20),
+        "level": rng.randint(1, 5),
+        "created_at": now,
+    }
+    user["_id"] = (await users_collection.insert_one(user)).inserted_id
+    user_id = str(user["_id"])
+    
+    def when() -> datetime:
+        # Up to two days either side of the period start, to catch boundary errors
+        return now - timedelta(seconds=rng.uniform(0, (days + 2) * 86400))
+    
+    tasks = []
+    for _ in range(docs):
+        created = when()
+        task = {"user_id": user_id, "title": "Parity", "completed": rng.random() < 0.6,
+                "created_at": created, "updated_at": created}
+        if task["completed"]:
+            completed_at = created + timedelta(seconds=rng.uniform(0, (now - created).total_seconds()))
+            if rng.random() < 0.2:
+                task["updated_at"] = completed_at  # Completed before completed_at was recorded
+            else:
+                task["completed_at"] = completed_at
+                task["updated_at"] = now  # Edited since; must not move the completion
+        tasks.append(task)
+    
+    mood_logs = [_document({
+        "user_id": user_id, "created_at": when(),
+        "mood_score": _maybe(rng, rng.randint(1, 10)), "focus_level": _maybe(rng, rng.randint(1, 10)),
+        "energy_level": rng.randint(1, 10), "stress_level": rng.randint(1, 10),
+    }) for _ in range(docs)]
+    
+    # Quarter steps are exact in binary, so summation order can't change the rounding
+    sleep_logs = [_document({
+        "user_id": user_id, "created_at": when(),
+        "hours_slept": _maybe(rng, rng.randint(12, 40) / 4), "sleep_debt": _maybe(rng, rng.randint(-8, 16) / 4),
+    }) for _ in range(docs)]
+    
+    skills = [_document({
+        "user_id": user_id, "skill_name": f"Skill {index}", "created_at": now,
+        "total_practice_time": _maybe(rng, rng.randint(0, 600)),
+    }) for index in range(rng.randint(0, 5))]
+    
+    for collection, documents in ((tasks_collection, tasks), (mood_logs_collection, mood_logs),
+                                  (sleep_logs_collection, sleep_logs), (user_skills_collection, skills)):
+        if documents:
+            await collection.insert_many(documents)
+    
+    # The documents bypassed the write paths, so build their rollups from raw data
+    await rebuild_rollups(user_id)
+    return to_api(user)
+
+# Fields the two intended changes may move away from the baseline
+PERIOD_FIELDS = {
+    "tasks.completed_this_period",
+    "mood.average_mood_score", "mood.average_focus_level", "mood.logs_count",
+    "sleep.average_hours", "sleep.total_sleep_debt", "sleep.logs_count",
+}
+
+async def python_dashboard(user: dict, start_date: datetime, by_completed_at: bool) -> dict:
+    """The per-document Python dashboard code; baseline is (now - days, by_completed_at=False)"""
+    user_id = user["id"]
+    
+    total_tasks = await tasks_collection.count_documents({"user_id": user_id})
+    completed_tasks = await tasks_collection.count_documents({"user_id": user_id, "completed": True})
+    if by_completed_at:
+        recent_completed = 0
+        async for task in tasks_collection.find({"user_id": user_id, "completed": True}):
+            if (task.get("completed_at") or task["updated_at"]) >= start_date:
+                recent_completed += 1
+    else:
+        recent_completed = await tasks_collection.count_documents({
+            "user_id": user_id,
+            "completed": True,
+            "updated_at": {"$gte": start_date}
+        })
+    
+    mood_logs = [log async for log in mood_logs_collection.find({"user_id": user_id, "created_at": {"$gte": start_date}})]
+    avg_mood = sum(log.get("mood_score", 0) for log in mood_logs) / len(mood_logs) if mood_logs else 0
+    avg_focus = sum(log.get("focus_level", 0) for log in mood_logs) / len(mood_logs) if mood_logs else 0
+    
+    sleep_logs = [log async for log in sleep_logs_collection.find({"user_id": user_id, "created_at": {"$gte": start_date}})]
+    total_sleep = sum(log.get("hours_slept", 0) for log in sleep_logs)
+    avg_sleep = total_sleep / len(sleep_logs) if sleep_logs else 0
+    total_sleep_debt = sum(log.get("sleep_debt", 0) for log in sleep_logs)
+    
+    total_skills = await user_skills_collection.count_documents({"user_id": user_id})
+    total_practice_time = 0
+    async for skill in user_skills_collection.find({"user_id": user_id}):
+        total_practice_time += skill.get("total_practice_time", 0)
+    
+    return {
+        "tasks": {
+            "total": total_tasks,
+            "completed": completed_tasks,
+            "pending": total_tasks - completed_tasks,
+            "completed_this_period": recent_completed,
+            "completion_rate": (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+        },
+        "mood": {
+            "average_mood_score": round(avg_mood, 1),
+            "average_focus_level": round(avg_focus, 1),
+            "logs_count": len(mood_logs)
+        },
+        "sleep": {
+            "average_hours": round(avg_sleep, 1),
+            "total_sleep_debt": round(total_sleep_debt, 1),
+            "logs_count": len(sleep_logs)
+        },
+        "skills": {
+            "total_skills": total_skills,
+            "total_practice_minutes": total_practice_time
+        },
+        "gamification": {
+            "total_points": user.get("total_points", 0),
+            "current_streak": user.get("current_streak", 0),
+            "longest_streak": user.get("longest_streak", 0),
+            "level": user.get("level", 1)
+        }
+    }
+
+def differences(expected: dict, actual: dict, path: str = "") -> list:
+    found = []
+    for key in expected.keys() | actual.keys():
+        left, right = expected.get(key), actual.get(key)
+        if isinstance(left, dict) and isinstance(right, dict):
+            found.extend(differences(left, right, f"{path}{key}."))
+        elif left is None or right is None or abs(left - right) > 1e-9:
+            found.append(f"{path}{key}: expected {left} got {right}")
+    return found
+
+async def cleanup(users: list):
+    ids = [user["id"] for user in users]
+    await users_collection.delete_many({"_id": {"$in": [ObjectId(user_id) for user_id in ids]}})
+    for collection in (tasks_collection, mood_logs_collection, sleep_logs_collection,
+                       user_skills_collection, user_daily_stats_collection):
+        await collection.delete_many({"user_id": {"$in": ids}})
+
+async def main(users: int, docs: int, periods: list, seed: int):
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to write to the default database; set DB_NAME to a scratch database")
+    
+    rng = random.Random(seed)
+    seeded = []
+    failures = 0
+    intended = 0
+    try:
+        for _ in range(users):
+            seeded.append(await seed_user(rng, docs, max(periods)))
+        
+        for user in seeded:
+            for days in periods:
+                now = datetime.utcnow()
+                actual = await build_dashboard(user, days)
+                baseline = await python_dashboard(user, now - timedelta(days=days), by_completed_at=False)
+                expected = await python_dashboard(user, day_start(now - timedelta(days=days)), by_completed_at=True)
+                
+                changed = differences(baseline, actual)
+                found = [line for line in changed if line.split(":")[0] not in PERIOD_FIELDS]
+                intended += len(changed) - len(found)
+                found += differences(expected, actual)
+                failures += bool(found)
+                for line in found:
+                    print(f"{user['id']} days={days} {line}")
+    finally:
+        await cleanup(seeded)
+    
+    print(f"{users} users x {len(periods)} periods, {docs} documents per collection: {failures} mismatched dashboards")
+    print(f"{intended} period fields differed from the baseline as intended (midnight start, completed_at)")
+    raise SystemExit(1 if failures else 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare build_dashboard with the per-document Python dashboard")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 30])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.docs, args.days, args.seed))
@@ -0,0 +1,123 @@
+# Export memory benchmark
+#
+# Seeds one user with N documents and streams /api/export through the ASGI
+# app, sampling peak RSS to show memory stays flat as history grows. The app
+# is called directly with a send() that counts and discards each chunk:
+# httpx.ASGITransport collects the whole body before returning it, which
+# would measure a buffered export instead.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.export_memory --documents 1000000
+
+import argparse
+import asyncio
+import random
+import resource
+import time
+from datetime import datetime, timedelta
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import users_collection, tasks_collection, mood_logs_collection, sleep_logs_collection
+from app.main import app
+
+SEED_BATCH = 10000
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def seed(user_id: str, documents: int):
+    now = datetime.utcnow()
+    collections = [tasks_collection, mood_logs_collection, sleep_logs_collection]
+    per_collection = documents // len(collections)
+    
+    for collection in collections:
+        await collection.delete_many({"user_id": user_id})
+        for offset in range(0, per_collection, SEED_BATCH):
+            batch = []
+            for i in range(offset, min(offset + SEED_BATCH, per_collection)):
+                created_at = now - timedelta(minutes=i)
+                if collection is tasks_collection:
+                    doc = {"title": f"Task {i}", "category": "study", "priority": "medium",
+                           "estimated_duration": 30, "cognitive_load": 5, "is_deep_work": False,
+                           "completed": i % 2 == 0, "updated_at": created_at}
+                elif collection is mood_logs_collection:
+                    doc = {"mood_score": random.randint(1, 10), "focus_level": random.randint(1, 10),
+                           "energy_level": random.randint(1, 10), "stress_level": random.randint(1, 10)}
+                else:
+                    doc = {"hours_slept": round(random.uniform(4, 9), 1), "quality": random.randint(1, 10),
+                           "sleep_debt": 0}
+                doc.update({"user_id": user_id, "created_at": created_at})
+                batch.append(doc)
+            await collection.insert_many(batch, ordered=False)
+
+async def export(token: str) -> tuple:
+    """(status, lines, bytes) of GET /api/export, holding no more than one chunk at a time"""
+    result = {"status": None, "lines": 0, "size": 0}
+    finished = asyncio.Event()
+    requested = False
+    
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # StreamingResponse listens for a disconnect while it streams
+        await finished.wait()
+        return {"type": "http.disconnect"}
+    
+    async def send(message: dict):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            result["lines"] += chunk.count(b"\n")
+            result["size"] += len(chunk)
+            if not message.get("more_body", False):
+                finished.set()
+    
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/export", "raw_path": b"/api/export", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return result["status"], result["lines"], result["size"]
+
+async def main(documents: int, reseed: bool):
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to seed the default database; set DB_NAME to a scratch database")
+    
+    user = await users_collection.find_one({"username": "export_bench"})
+    if not user:
+        result = await users_collection.insert_one({
+            "email": "export_bench@example.com", "username": "export_bench", "hashed_password": "",
+            "total_points": 0, "level": 1, "created_at": datetime.utcnow()
+        })
+        user = {"_id": result.inserted_id}
+    user_id = str(user["_id"])
+    
+    if reseed:
+        start = time.perf_counter()
+        await seed(user_id, documents)
+        print(f"Seeded {documents} documents in {time.perf_counter() - start:.1f}s")
+    
+    token = create_access_token({"sub": user_id}, timedelta(minutes=30))
+    baseline = peak_rss_mb()
+    
+    start = time.perf_counter()
+    status, lines, size = await export(token)
+    elapsed = time.perf_counter() - start
+    if status != 200:
+        raise SystemExit(f"Export failed with status {status}")
+    
+    print(f"Exported {lines} rows ({size / 1024 / 1024:.1f} MiB) in {elapsed:.1f}s ({lines / elapsed:.0f} rows/s)")
+    print(f"Peak RSS: {baseline:.1f} MiB before export, {peak_rss_mb():.1f} MiB after")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export memory benchmark")
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--no-seed", dest="reseed", action="store_false")
+    args = parser.parse_args()
+    asyncio.run(main(args.documents, args.reseed))
@@ -0,0 +1,78 @@
+# JSON response encoding benchmark
+#
+# Times turning a 10k-task get_tasks page into response bytes three ways:
+#   validated  - response_model validation, then the stdlib JSONResponse (default)
+#   fast       - response_model validation, then FastJSONResponse (FAST_JSON_RESPONSES)
+#   trusted    - FastJSONResponse straight from the documents (TRUSTED_RESPONSES)
+# No database is needed; the documents are built in memory like fetch_page returns them.
+#
+#   python -m benchmarks.json_encoding --tasks 10000
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.responses import FastJSONResponse, orjson
+from app.schemas import TaskResponse
+
+def build_tasks(count: int) -> list:
+    now = datetime.utcnow()
+    user_id = str(ObjectId())
+    return [{
+        "id": str(ObjectId()),
+        "user_id": user_id,
+        "title": f"Complete Algorithm Assignment #{i}",
+        "description": "Implement Dijkstra's shortest path algorithm in Python",
+        "category": "coding",
+        "priority": "high",
+        "estimated_duration": 120,
+        "cognitive_load": 8,
+        "is_deep_work": True,
+        "scheduled_date": None,
+        "scheduled_start_time": None,
+        "scheduled_end_time": None,
+        "completed": i % 2 == 0,
+        "created_at": now - timedelta(minutes=i),
+        "updated_at": now - timedelta(minutes=i),
+    } for i in range(count)]
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(count: int, repeat: int):
+    tasks = build_tasks(count)
+    adapter = TypeAdapter(List[TaskResponse])
+    
+    # What FastAPI does with a response_model: validate, dump to JSON types, render
+    def validated():
+        return JSONResponse(adapter.dump_python(adapter.validate_python(tasks), mode="json")).body
+    
+    def fast():
+        return FastJSONResponse(adapter.dump_python(adapter.validate_python(tasks), mode="json")).body
+    
+    def trusted():
+        return FastJSONResponse(tasks).body
+    
+    print(f"{count} tasks, best of {repeat}, orjson {'installed' if orjson else 'missing (stdlib fallback)'}")
+    baseline = None
+    for name, func in (("validated", validated), ("fast", fast), ("trusted", trusted)):
+        elapsed = best_of(func, repeat)
+        baseline = baseline or elapsed
+        print(f"{name:10} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x  {len(func()) / 1024:.0f} KiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare response encoding paths")
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.tasks, args.repeat)
@@ -0,0 +1,180 @@
+# Load benchmark
+#
+# Drives the read and write endpoints of every router through the ASGI app
+# as the seeded benchmark users (see benchmarks.seed). Reports throughput,
+# p50/p95/p99 latency and Mongo commands per request, and writes the results
+# to JSON. Pass --baseline with an earlier results file to flag regressions.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.load --output results.json
+#   DB_NAME=planwise_bench python -m benchmarks.load --baseline results.json
+#
+# Needs a real mongod: seeding and the endpoints use aggregation and
+# projection operators that in-memory stand-ins don't implement.
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import users_collection, track_commands
+from app.jobs import job_queue
+from app.main import app
+from benchmarks.seed import USERNAME_PREFIX, seed
+
+# (name, method, path, json body)
+SCENARIOS = [
+    ("users.me", "GET", "/api/users/me", None),
+    ("tasks.list", "GET", "/api/tasks/", None),
+    ("tasks.list_fields", "GET", "/api/tasks/?fields=id,title,completed", None),
+    ("tasks.create", "POST", "/api/tasks/", {"title": "Load test task", "category": "study"}),
+    ("mood.list", "GET", "/api/mood/", None),
+    ("mood.latest", "GET", "/api/mood/latest", None),
+    ("mood.create", "POST", "/api/mood/", {"mood_score": 7, "focus_level": 6, "energy_level": 5, "stress_level": 4}),
+    ("sleep.list", "GET", "/api/sleep/", None),
+    ("sleep.debt", "GET", "/api/sleep/debt", None),
+    ("sleep.create", "POST", "/api/sleep/", {"hours_slept": 7.5, "quality": 8}),
+    ("skills.list", "GET", "/api/skills/", None),
+    ("skills.achievements", "GET", "/api/skills/achievements", None),
+    ("analytics.dashboard", "GET", "/api/analytics/dashboard", None),
+    ("analytics.dashboard_30d", "GET", "/api/analytics/dashboard?days=30", None),
+    ("analytics.trends", "GET", "/api/analytics/productivity-trends", None),
+    ("analytics.trends_month", "GET", "/api/analytics/productivity-trends?days=365&bucket=month", None),
+    ("campus.events", "GET", "/api/campus/events", None),
+]
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+async def run_scenario(client, tokens: list, method: str, path: str, body, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests with at most `concurrency` in flight, each as a random user"""
+    latencies = []
+    commands = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one():
+        nonlocal errors
+        headers = {"Authorization": f"Bearer {random.choice(tokens)}"}
+        async with semaphore:
+            # Each request runs in its own task, so the command counts don't mix
+            with track_commands() as stats:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body, headers=headers)
+                latencies.append(time.perf_counter() - start)
+            commands.append(stats.count)
+            errors += response.status_code >= 400
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "db_ops_per_request": round(sum(commands) / len(commands), 2),
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """Print the p95 change per scenario; returns the number of regressions"""
+    regressions = 0
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0
+        more_ops = current["db_ops_per_request"] > previous["db_ops_per_request"]
+        regressed = change > tolerance or more_ops
+        regressions += regressed
+        print(f"{'REGRESSED' if regressed else 'ok':9} {name:26} p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms "
+              f"({change:+.0%}), db ops {previous['db_ops_per_request']} -> {current['db_ops_per_request']}")
+    return regressions
+
+async def main(args) -> int:
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to write to the default database; set DB_NAME to a scratch database")
+    
+    if args.seed_users:
+        await seed(args.seed_users, args.seed_tasks, args.seed_logs)
+    
+    users = [user async for user in users_collection.find(
+        {"username": {"$regex": f"^{USERNAME_PREFIX}"}}, {"_id": 1}
+    ).limit(args.users)]
+    if not users:
+        raise SystemExit("No benchmark users found; run python -m benchmarks.seed first")
+    tokens = [create_access_token({"sub": str(user["_id"])}, timedelta(hours=1)) for user in users]
+    
+    scenarios = [s for s in SCENARIOS if not args.only or any(s[0].startswith(prefix) for prefix in args.only)]
+    random.seed(args.random_seed)
+    
+    await job_queue.start()
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "db_name": settings.DB_NAME,
+        "users": len(tokens),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": {},
+    }
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        # One pass over every scenario warms the user cache and the achievement catalog
+        for _, method, path, body in scenarios:
+            await client.request(method, path, json=body, headers={"Authorization": f"Bearer {tokens[0]}"})
+        
+        for name, method, path, body in scenarios:
+            result = await run_scenario(client, tokens, method, path, body, args.requests, args.concurrency)
+            results["scenarios"][name] = result
+            print(f"{name:26} {result['throughput_rps']:8.1f} rps  p50 {result['p50_ms']:7.2f}  "
+                  f"p95 {result['p95_ms']:7.2f}  p99 {result['p99_ms']:7.2f} ms  "
+                  f"{result['db_ops_per_request']:5.2f} ops  {result['errors']} errors")
+    await job_queue.drain(timeout=30)
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {baseline.get('commit') or args.baseline}")
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API through the ASGI app")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000, help="number of seeded users to spread requests over")
+    parser.add_argument("--only", nargs="*", help="scenario name prefixes, e.g. analytics tasks.list")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown before flagging a regression")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--seed-users", type=int, default=0, help="seed this many users first")
+    parser.add_argument("--seed-tasks", type=int, default=200)
+    parser.add_argument("--seed-logs", type=int, default=90)
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,90 @@
+# Login storm load test
+#
+# Fires concurrent logins at a running server while probing /health and
+# /api/tasks/, then prints probe latency percentiles with and without the
+# storm. With password hashing off the event loop, p99 should stay flat.
+#
+#   python -m benchmarks.login_storm --url http://localhost:8000 --logins 200
+
+import argparse
+import asyncio
+import secrets
+import statistics
+import time
+
+import httpx
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def probe(client: httpx.AsyncClient, path: str, headers: dict, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+async def measure(client: httpx.AsyncClient, headers: dict, duration: float, storm=None) -> dict:
+    stop = asyncio.Event()
+    samples = {"/health": [], "/api/tasks/": []}
+    probes = [asyncio.create_task(probe(client, path, headers, stop, samples[path])) for path in samples]
+    
+    if storm is not None:
+        await storm
+    else:
+        await asyncio.sleep(duration)
+    
+    stop.set()
+    await asyncio.gather(*probes)
+    return {
+        path: {
+            "count": len(values),
+            "p50_ms": round(statistics.median(values), 2) if values else 0,
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+        for path, values in samples.items()
+    }
+
+async def login_storm(client: httpx.AsyncClient, email: str, password: str, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def login():
+        async with semaphore:
+            await client.post("/api/auth/login", json={"email": email, "password": password})
+    
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+async def main(url: str, logins: int, concurrency: int, duration: float):
+    password = secrets.token_urlsafe(12)
+    username = f"storm_{secrets.token_hex(4)}"
+    email = f"{username}@example.com"
+    
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        response = await client.post("/api/auth/register", json={
+            "email": email, "username": username, "password": password
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        
+        idle = await measure(client, headers, duration)
+        start = time.perf_counter()
+        storm = await measure(client, headers, duration, login_storm(client, email, password, logins, concurrency))
+        storm_seconds = time.perf_counter() - start
+    
+    print(f"{logins} logins at concurrency {concurrency} took {storm_seconds:.1f}s")
+    for path in idle:
+        print(f"{path:12} idle  p50={idle[path]['p50_ms']:7.2f}ms p99={idle[path]['p99_ms']:7.2f}ms"
+              f"  storm p50={storm[path]['p50_ms']:7.2f}ms p99={storm[path]['p99_ms']:7.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login storm load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to sample idle latency")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.logins, args.concurrency, args.duration))
@@ -0,0 +1,59 @@
+# Concurrent practice log check
+#
+# Fires parallel PUT /api/skills/{id}/practice requests at the ASGI app and
+# verifies that no minutes were lost in the final total_practice_time.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.practice_race --requests 200
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import users_collection, user_skills_collection
+from app.main import app
+
+async def main(requests: int, minutes: int):
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to write to the default database; set DB_NAME to a scratch database")
+    
+    result = await users_collection.insert_one({
+        "email": f"race_{datetime.utcnow().timestamp()}@example.com",
+        "username": f"race_{datetime.utcnow().timestamp()}",
+        "hashed_password": "",
+        "created_at": datetime.utcnow()
+    })
+    user_id = str(result.inserted_id)
+    skill = await user_skills_collection.insert_one({
+        "user_id": user_id, "skill_name": "Race", "target_level": 10,
+        "current_level": 1, "total_practice_time": 0, "created_at": datetime.utcnow()
+    })
+    
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user_id}, timedelta(minutes=5))}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        responses = await asyncio.gather(*(
+            client.put(f"/api/skills/{skill.inserted_id}/practice", params={"minutes": minutes}, headers=headers)
+            for _ in range(requests)
+        ))
+    
+    final = await user_skills_collection.find_one({"_id": skill.inserted_id})
+    expected = requests * minutes
+    failures = sum(1 for response in responses if response.status_code != 200)
+    
+    print(f"{requests} parallel logs of {minutes} min, {failures} failed requests")
+    print(f"total_practice_time={final['total_practice_time']} expected={expected} level={final['current_level']}")
+    
+    await user_skills_collection.delete_one({"_id": skill.inserted_id})
+    await users_collection.delete_one({"_id": result.inserted_id})
+    
+    raise SystemExit(0 if final["total_practice_time"] == expected and not failures else 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent practice log check")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--minutes", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.minutes))
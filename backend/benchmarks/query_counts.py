@@ -0,0 +1,76 @@
+# Query budget check
+#
+# Calls each endpoint through the ASGI app inside track_commands() and
+# compares the number of Mongo commands with its budget. Background jobs run
+# on the job queue, so only the commands on the request path are counted.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.query_counts
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import users_collection, track_commands
+from app.jobs import job_queue
+from app.main import app
+
+# (method, path, json body, max commands)
+BUDGETS = [
+    ("GET", "/api/users/me", None, 0),
+    ("POST", "/api/tasks/", {"title": "Budget task"}, 2),
+    ("GET", "/api/tasks/", None, 1),
+    ("PUT", "/api/tasks/{task_id}", {"completed": True}, 2),
+    ("POST", "/api/mood/", {"mood_score": 7, "focus_level": 6, "energy_level": 5, "stress_level": 4}, 2),
+    ("GET", "/api/mood/latest", None, 1),
+    ("POST", "/api/sleep/", {"hours_slept": 7.5, "quality": 8}, 2),
+    ("GET", "/api/sleep/", None, 1),
+    ("GET", "/api/skills/", None, 1),
+    ("GET", "/api/skills/achievements", None, 1),
+    ("GET", "/api/analytics/dashboard", None, 4),
+    ("GET", "/api/analytics/productivity-trends", None, 1),
+    ("GET", "/api/campus/events", None, 1),
+]
+
+async def main() -> int:
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to write to the default database; set DB_NAME to a scratch database")
+    
+    result = await users_collection.insert_one({
+        "email": f"budget_{datetime.utcnow().timestamp()}@example.com",
+        "username": f"budget_{datetime.utcnow().timestamp()}",
+        "hashed_password": "",
+        "total_points": 0,
+        "daily_sleep_goal": 8.0,
+        "created_at": datetime.utcnow(),
+    })
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(result.inserted_id)}, timedelta(minutes=5))}"}
+    
+    await job_queue.start()
+    failures = 0
+    context = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Warm the user cache and the achievement catalog first
+        await client.get("/api/users/me", headers=headers)
+        await client.get("/api/skills/achievements", headers=headers)
+        
+        for method, path, body, budget in BUDGETS:
+            url = path.format(**context)
+            with track_commands() as stats:
+                response = await client.request(method, url, json=body, headers=headers)
+            
+            if method == "POST" and path == "/api/tasks/":
+                context["task_id"] = response.json()["id"]
+            
+            ok = response.status_code < 400 and stats.count <= budget
+            failures += not ok
+            print(f"{'ok' if ok else 'FAIL':4} {method:4} {path:40} {stats.count}/{budget} {', '.join(stats.commands)}")
+    
+    await job_queue.drain(timeout=5)
+    await users_collection.delete_one({"_id": result.inserted_id})
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,184 @@
+# Benchmark data seeding
+#
+# Fills a scratch database with users, tasks, mood and sleep logs, skills and
+# campus events shaped like mock_sql_data.txt, then builds the daily rollups
+# and streaks the analytics endpoints read. A fixed --seed makes two runs
+# produce the same data, so load results can be compared between commits.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.seed --users 2000 --tasks 500 --logs 365
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.database import (
+    users_collection, tasks_collection, mood_logs_collection, sleep_logs_collection,
+    user_skills_collection, campus_events_collection, user_daily_stats_collection
+)
+from app.gamification import backfill
+from app.indexes import ensure_indexes
+from app.stats import rebuild_rollups
+
+SEED_BATCH = 10000
+USERNAME_PREFIX = "bench_user"
+
+TASK_TEMPLATES = [
+    ("Complete Algorithm Assignment", "coding", True, 9),
+    ("Study for Data Structures Exam", "study", True, 8),
+    ("Morning Workout", "fitness", False, 4),
+    ("Read Chapter - OS Concepts", "reading", True, 7),
+    ("Build REST API for Project", "coding", True, 8),
+    ("Write Blog Post", "writing", True, 6),
+    ("Linear Algebra Problem Set", "study", True, 9),
+    ("Team Meeting", "meeting", False, 3),
+]
+PRIORITIES = ["low", "medium", "high", "urgent"]
+SKILLS = [
+    ("Python Programming", "coding"), ("Data Structures", "study"), ("Machine Learning", "study"),
+    ("Web Development", "coding"), ("Public Speaking", "social"), ("Guitar", "creative"),
+]
+EVENTS = [
+    ("AI & Machine Learning Workshop", "workshop", "Engineering Building - Room 301"),
+    ("Career Fair", "career", "Student Union - Main Hall"),
+    ("Hackathon: Code for Good", "competition", "Innovation Lab"),
+    ("Study Group: Calculus", "academic", "Library - Room 204"),
+]
+
+def _task(rng: random.Random, user_id: str, i: int, created_at: datetime) -> dict:
+    title, category, deep_work, load = rng.choice(TASK_TEMPLATES)
+    completed = rng.random() < 0.6
+    completed_at = created_at + timedelta(hours=rng.randint(1, 48)) if completed else None
+    return {
+        "user_id": user_id,
+        "title": f"{title} #{i}",
+        "description": None,
+        "category": category,
+        "priority": rng.choice(PRIORITIES),
+        "estimated_duration": rng.choice([30, 45, 60, 90, 120, 180]),
+        "cognitive_load": load,
+        "is_deep_work": deep_work,
+        "completed": completed,
+        "completed_at": completed_at,
+        "created_at": created_at,
+        "updated_at": completed_at or created_at,
+    }
+
+def _mood(rng: random.Random, user_id: str, created_at: datetime) -> dict:
+    return {
+        "user_id": user_id,
+        "mood_score": rng.randint(3, 10),
+        "focus_level": rng.randint(2, 10),
+        "energy_level": rng.randint(2, 10),
+        "stress_level": rng.randint(1, 9),
+        "notes": None,
+        "created_at": created_at,
+    }
+
+def _sleep(rng: random.Random, user_id: str, created_at: datetime) -> dict:
+    hours = round(rng.uniform(5, 9), 1)
+    return {
+        "user_id": user_id,
+        "hours_slept": hours,
+        "quality": rng.randint(3, 10),
+        "notes": None,
+        "sleep_debt": max(0, 8.0 - hours),
+        "created_at": created_at,
+    }
+
+async def _insert(collection, docs) -> int:
+    """Insert an iterable of documents in SEED_BATCH sized batches"""
+    inserted = 0
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == SEED_BATCH:
+            await collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return inserted
+
+async def seed(users: int, tasks: int, logs: int, seed_value: int = 42) -> dict:
+    """Replace the benchmark users and their data; returns the number of documents per collection"""
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to seed the default database; set DB_NAME to a scratch database")
+    
+    rng = random.Random(seed_value)
+    now = datetime.utcnow().replace(microsecond=0)
+    
+    old_ids = [str(user["_id"]) async for user in users_collection.find(
+        {"username": {"$regex": f"^{USERNAME_PREFIX}"}}, {"_id": 1}
+    )]
+    for collection in (tasks_collection, mood_logs_collection, sleep_logs_collection,
+                       user_skills_collection, user_daily_stats_collection):
+        await collection.delete_many({"user_id": {"$in": old_ids}})
+    await users_collection.delete_many({"username": {"$regex": f"^{USERNAME_PREFIX}"}})
+    await campus_events_collection.delete_many({"created_by": "bench"})
+    
+    result = await users_collection.insert_many([{
+        "email": f"{USERNAME_PREFIX}{n}@example.com",
+        "username": f"{USERNAME_PREFIX}{n}",
+        "full_name": f"Bench User {n}",
+        "hashed_password": "",
+        "total_points": 0,
+        "current_streak": 0,
+        "longest_streak": 0,
+        "level": 1,
+        "daily_sleep_goal": 8.0,
+        "created_at": now - timedelta(days=logs),
+    } for n in range(users)])
+    user_ids = [str(_id) for _id in result.inserted_ids]
+    
+    counts = {"users": len(user_ids)}
+    # Spread each user's history over the last `logs` days
+    span = timedelta(days=max(logs, 1))
+    counts["tasks"] = await _insert(tasks_collection, (
+        _task(rng, user_id, i, now - span * rng.random())
+        for user_id in user_ids for i in range(tasks)
+    ))
+    counts["mood_logs"] = await _insert(mood_logs_collection, (
+        _mood(rng, user_id, now - timedelta(days=day, hours=rng.randint(0, 12)))
+        for user_id in user_ids for day in range(logs)
+    ))
+    counts["sleep_logs"] = await _insert(sleep_logs_collection, (
+        _sleep(rng, user_id, now - timedelta(days=day, hours=rng.randint(0, 3)))
+        for user_id in user_ids for day in range(logs)
+    ))
+    counts["user_skills"] = await _insert(user_skills_collection, (
+        {"user_id": user_id, "skill_name": name, "category": category, "target_level": 10,
+         "current_level": rng.randint(1, 8), "total_practice_time": rng.randint(0, 6000),
+         "last_practiced": now - timedelta(days=rng.randint(0, 30)), "created_at": now - span}
+        for user_id in user_ids for name, category in rng.sample(SKILLS, 3)
+    ))
+    counts["campus_events"] = await _insert(campus_events_collection, (
+        {"title": f"{title} {i}", "description": None, "category": category, "location": location,
+         "event_date": now + timedelta(days=rng.randint(-30, 60), hours=rng.randint(8, 20)),
+         "created_by": "bench", "created_at": now - timedelta(days=30)}
+        for i in range(200) for title, category, location in [rng.choice(EVENTS)]
+    ))
+    
+    await rebuild_rollups()
+    await backfill()
+    return counts
+
+async def main(users: int, tasks: int, logs: int, seed_value: int):
+    await ensure_indexes()
+    start = time.perf_counter()
+    counts = await seed(users, tasks, logs, seed_value)
+    for name, count in counts.items():
+        print(f"{name:15} {count}")
+    print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a scratch database for the load benchmarks")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=500, help="tasks per user")
+    parser.add_argument("--logs", type=int, default=365, help="days of mood and sleep logs per user")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.tasks, args.logs, args.seed))
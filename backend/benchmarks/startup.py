@@ -0,0 +1,97 @@
+# Startup time benchmark
+#
+# Starts serve.py as a real server with and without warmup and measures the
+# time until /health answers (process up), until /ready answers 200, and the
+# latency of the first and second request to a few endpoints that depend on
+# connections and caches the warmup prepares. Needs a real mongod.
+#
+#   DB_NAME=planwise_bench python -m benchmarks.startup --runs 3
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth import create_access_token
+from app.config import settings
+from app.database import users_collection
+
+ENDPOINTS = [
+    "/api/users/me",
+    "/api/campus/events",
+    "/api/skills/achievements",
+    "/api/analytics/dashboard",
+]
+
+async def wait_for(client: httpx.AsyncClient, path: str, started: float, timeout: float = 60) -> float:
+    """Seconds from `started` until `path` answers 200"""
+    while time.perf_counter() - started < timeout:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.02)
+    raise SystemExit(f"{path} didn't answer within {timeout}s")
+
+async def run_once(port: int, warmup: bool, headers: dict) -> dict:
+    env = {**os.environ, "WARMUP_ON_STARTUP": str(warmup), "DEBUG": "False"}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--port", str(port), "--workers", "1"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            result = {
+                "health": await wait_for(client, "/health", started),
+                "ready": await wait_for(client, "/ready", started),
+            }
+            
+            for path in ENDPOINTS:
+                for attempt in ("first", "second"):
+                    start = time.perf_counter()
+                    response = await client.get(path, headers=headers)
+                    response.raise_for_status()
+                    result[(path, attempt)] = time.perf_counter() - start
+            return result
+    finally:
+        server.terminate()
+        server.wait()
+
+async def main(runs: int, port: int):
+    if settings.DB_NAME == "planwise":
+        raise SystemExit("Refusing to write to the default database; set DB_NAME to a scratch database")
+    
+    user = await users_collection.insert_one({
+        "email": f"startup_{datetime.utcnow().timestamp()}@example.com",
+        "username": f"startup_{datetime.utcnow().timestamp()}",
+        "hashed_password": "",
+        "total_points": 0,
+        "daily_sleep_goal": 8.0,
+        "created_at": datetime.utcnow(),
+    })
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.inserted_id)}, timedelta(minutes=30))}"}
+    
+    for warmup in (False, True):
+        samples = [await run_once(port, warmup, headers) for _ in range(runs)]
+        print(f"\nWARMUP_ON_STARTUP={warmup} ({runs} runs, median ms)")
+        print(f"  {'process up (/health)':40} {statistics.median(s['health'] for s in samples) * 1000:8.1f}")
+        print(f"  {'ready (/ready)':40} {statistics.median(s['ready'] for s in samples) * 1000:8.1f}")
+        for path in ENDPOINTS:
+            first = statistics.median(s[(path, 'first')] for s in samples) * 1000
+            second = statistics.median(s[(path, 'second')] for s in samples) * 1000
+            print(f"  {path:40} {first:8.1f} first {second:8.1f} second")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure server startup and first-request latency")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.port))
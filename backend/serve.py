@@ -0,0 +1,70 @@
+import argparse
+import math
+import os
+import uvicorn
+from app.config import settings
+
+# Production entry point (run.py is for development: one process, reload).
+# Runs several uvicorn worker processes and picks uvloop and httptools when
+# they're installed (they come with uvicorn[standard]).
+#
+#   python serve.py --port $PORT
+#
+# Each worker has its own caches, job queue and event stream hub; set
+# STREAM_BACKEND=mongo so live updates reach streams on every worker.
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring a container's CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS or Windows
+        cpus = os.cpu_count() or 1
+    
+    # cgroup v2 quota, e.g. "150000 100000" for 1.5 CPUs or "max 100000"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+def worker_count() -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    # The app is async, so one worker per CPU keeps every core busy
+    return max(1, min(available_cpus(), settings.SERVER_MAX_WORKERS))
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=None, help="default: WEB_CONCURRENCY or one per CPU")
+    args = parser.parse_args()
+    
+    workers = args.workers or worker_count()
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port} (loop={loop}, http={http})")
+    
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        # Render terminates TLS in front of the app
+        proxy_headers=True,
+        forwarded_allow_ips="*",
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        access_log=settings.DEBUG,
+    )
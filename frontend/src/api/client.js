@@ -25,6 +25,8 @@ client.interceptors.request.use((config) => {
 export const auth = {
   register: (data) => client.post('/auth/register', data),
   login: (data) => client.post('/auth/login', data),
+  // Token passed explicitly: it is removed from storage before the interceptor runs
+  logout: (token) => client.post('/auth/logout', null, { headers: { Authorization: `Bearer ${token}` } }),
 };
 
 // User API
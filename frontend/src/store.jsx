@@ -1,5 +1,6 @@
 import { create } from 'zustand';
 import { persist } from 'zustand/middleware';
+import { auth } from './api/client';
 
 export const useAuthStore = create(
   persist(
@@ -12,6 +13,9 @@ export const useAuthStore = create(
         set({ user, token, isAuthenticated: true });
       },
       logout: () => {
+        // Revoke the token server-side; local state is cleared either way
+        const token = localStorage.getItem('token');
+        if (token) auth.logout(token).catch(() => {});
         localStorage.removeItem('token');
         set({ user: null, token: null, isAuthenticated: false });
       },